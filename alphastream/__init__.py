@@ -0,0 +1 @@
+"""AlphaStream Wealth Master engine modules shared by the Streamlit app."""
@@ -0,0 +1,168 @@
+"""Process-wide TTL cache shared by every Streamlit session and rerun.
+
+Entries are grouped by data kind, each with its own TTL (seconds):
+
+    ALPHASTREAM_CACHE_TTL_QUOTE    intraday quotes      (default 60)
+    ALPHASTREAM_CACHE_TTL_HISTORY  daily history        (default 900)
+    ALPHASTREAM_CACHE_TTL_INFO     ticker metadata      (default 86400)
+    ALPHASTREAM_CACHE_TTL_VALIDATION  ticker validation (default 300)
+    ALPHASTREAM_CACHE_SIZE         max entries, LRU     (default 2048)
+
+Concurrent callers missing the same key wait on a single in-flight fetch.
+Cached values are shared objects and must not be mutated by callers.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from alphastream.providers import MarketDataProvider
+
+DEFAULT_TTLS = {"quote": 60, "history": 900, "info": 86400, "validation": 300}
+
+
+class TTLCache:
+    """Bounded LRU cache with per-kind TTLs, hit/miss counters and single-flight fetches"""
+
+    def __init__(self, ttls=None, max_entries=2048, clock=time.monotonic):
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _count(self, kind, field, n=1):
+        self._stats.setdefault(kind, {"hits": 0, "misses": 0, "evictions": 0})[field] += n
+
+    def _lookup(self, key):
+        """Return (found, value) for a live entry; caller holds the lock"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires, value = entry
+        if expires <= self.clock():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _store(self, key, value):
+        """Insert an entry and evict least recently used ones; caller holds the lock"""
+        kind = key[0]
+        self._entries[key] = (self.clock() + self.ttls.get(kind, 0), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._count(evicted[0], "evictions")
+
+    def get_or_fetch(self, kind, key, fetch):
+        """Return the cached value for (kind, key), calling fetch() once on a miss"""
+        return self.get_many(kind, [key], lambda missing: {missing[0]: fetch()})[key]
+
+    def get_many(self, kind, keys, fetch_many):
+        """Return {key: value}, resolving every miss with one fetch_many(missing) call
+
+        Keys that fetch_many leaves out are reported as missing from the result
+        and are not cached.
+        """
+        result, waiting, missing = {}, {}, []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                full_key = (kind, key)
+                found, value = self._lookup(full_key)
+                if found:
+                    self._count(kind, "hits")
+                    result[key] = value
+                elif full_key in self._inflight:
+                    self._count(kind, "hits")
+                    waiting[key] = self._inflight[full_key]
+                else:
+                    self._count(kind, "misses")
+                    self._inflight[full_key] = Future()
+                    missing.append(key)
+
+        if missing:
+            try:
+                fetched = fetch_many(missing)
+            except BaseException as exc:
+                with self._lock:
+                    for key in missing:
+                        self._inflight.pop((kind, key)).set_exception(exc)
+                raise
+            with self._lock:
+                for key in missing:
+                    future = self._inflight.pop((kind, key))
+                    if key in fetched:
+                        self._store((kind, key), fetched[key])
+                        result[key] = fetched[key]
+                    future.set_result(fetched.get(key, _MISSING))
+
+        for key, future in waiting.items():
+            value = future.result()
+            if value is not _MISSING:
+                result[key] = value
+        return result
+
+    def put(self, kind, key, value):
+        """Store a value directly, e.g. from a background refresher"""
+        with self._lock:
+            self._store((kind, key), value)
+
+    def invalidate(self, kind=None):
+        """Drop every entry, or every entry of one kind"""
+        with self._lock:
+            for key in [k for k in self._entries if kind is None or k[0] == kind]:
+                del self._entries[key]
+
+    def stats(self):
+        """Return {kind: {hits, misses, evictions, entries}} counters"""
+        with self._lock:
+            stats = {kind: dict(counts) for kind, counts in self._stats.items()}
+            for kind, _ in self._entries:
+                stats.setdefault(kind, {"hits": 0, "misses": 0, "evictions": 0})
+                stats[kind]["entries"] = stats[kind].get("entries", 0) + 1
+            return stats
+
+
+_MISSING = object()
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide cache configured from the environment"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            ttls = {
+                kind: float(os.environ[f"ALPHASTREAM_CACHE_TTL_{kind.upper()}"])
+                for kind in DEFAULT_TTLS
+                if f"ALPHASTREAM_CACHE_TTL_{kind.upper()}" in os.environ
+            }
+            _shared = TTLCache(ttls, max_entries=int(os.environ.get("ALPHASTREAM_CACHE_SIZE", 2048)))
+        return _shared
+
+
+class CachedProvider(MarketDataProvider):
+    """Wraps a provider so quotes, history and metadata are served from a TTLCache"""
+
+    def __init__(self, provider, cache=None):
+        self.provider = provider
+        self.cache = cache or get_cache()
+        self.name = provider.name
+        self.label = provider.label
+
+    def history(self, symbols, start=None, period=None):
+        key = (tuple(symbols), str(start) if start else None, period)
+        return self.cache.get_or_fetch(
+            "history", key, lambda: self.provider.history(list(symbols), start=start, period=period)
+        )
+
+    def quotes(self, symbols):
+        return self.cache.get_many("quote", list(symbols), self.provider.quotes)
+
+    def info(self, symbol):
+        return self.cache.get_or_fetch("info", symbol, lambda: self.provider.info(symbol))
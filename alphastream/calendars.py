@@ -0,0 +1,92 @@
+"""Trading-calendar alignment of multi-exchange close frames.
+
+Mixed listings (e.g. TSX and NYSE holdings in one profile) leave NaN on
+days only one exchange traded. align() reindexes a close frame onto the
+union of its exchanges' sessions and fills those holes, so valuation and
+charts work on dense float arrays. Sessions come from exchange_calendars
+when it is installed; without it the frame's own dates (every day at least
+one symbol traded) are the index.
+
+exchange_calendars is not in requirements.txt, so in a standard install
+only the gap filling is active: the index is the dates the price store
+returned, and a session missing from every symbol stays missing.
+
+The default ffill_only carries closes forward but leaves the days before
+a symbol listed as NaN, so nothing is valued before it could be bought.
+"""
+from functools import lru_cache
+
+import pandas as pd
+
+try:
+    import exchange_calendars as xcals
+except ImportError:
+    xcals = None
+
+DEFAULT_EXCHANGE = "XNYS"
+SUFFIX_EXCHANGES = {
+    "TO": "XTSE", "V": "XTSE", "NE": "XTSE", "CN": "XTSE",
+    "L": "XLON", "DE": "XETR", "PA": "XPAR", "AS": "XAMS", "SW": "XSWX",
+    "AX": "XASX", "HK": "XHKG", "T": "XTKS",
+}
+# ffill_only: carry the last close over another exchange's sessions, leave
+#             the days before a symbol listed as NaN
+# ffill: also value a later-listed symbol at its first close before it traded
+# none: reindex only
+FILL_POLICIES = ("ffill_only", "ffill", "none")
+
+
+def exchange_for(symbol):
+    """Exchange calendar code for a Yahoo-style symbol, by suffix"""
+    _, dot, suffix = symbol.rpartition(".")
+    return SUFFIX_EXCHANGES.get(suffix.upper(), DEFAULT_EXCHANGE) if dot else DEFAULT_EXCHANGE
+
+
+@lru_cache(maxsize=64)
+def sessions(exchange, start, end):
+    """Session dates for exchange between start and end, or None without calendar data"""
+    if xcals is None:
+        return None
+    try:
+        calendar = xcals.get_calendar(exchange)
+        start = max(pd.Timestamp(start), calendar.first_session)
+        end = min(pd.Timestamp(end), calendar.last_session)
+        return pd.DatetimeIndex(calendar.sessions_in_range(start, end).tz_localize(None))
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=256)
+def union_index(exchanges, start, end):
+    """Union of the sessions of every exchange in the tuple; None when any calendar is unavailable"""
+    union = None
+    for exchange in exchanges:
+        days = sessions(exchange, start, end)
+        if days is None:
+            return None
+        union = days if union is None else union.union(days)
+    return union
+
+
+def calendar_available():
+    """Whether exchange session calendars are installed (otherwise align only fills gaps)"""
+    return xcals is not None
+
+
+def align(frame, policy="ffill_only"):
+    """Reindex a date x symbol close frame onto its exchanges' union calendar and fill gaps"""
+    if policy not in FILL_POLICIES:
+        raise ValueError(f"Unknown fill policy {policy!r}; expected one of {', '.join(FILL_POLICIES)}")
+    frame = frame.dropna(how="all")
+    if frame.empty:
+        return frame
+    exchanges = tuple(sorted({exchange_for(s) for s in frame.columns}))
+    days = union_index(exchanges, frame.index[0].normalize(), frame.index[-1].normalize())
+    if days is not None:
+        # Keep any bar the calendar does not know about rather than dropping data
+        frame = frame.reindex(days.union(frame.index))
+    if policy != "none":
+        frame = frame.ffill()
+        if policy == "ffill":
+            frame = frame.bfill()
+    return frame
@@ -0,0 +1,203 @@
+"""Performance chart construction with LTTB downsampling and optional WebGL traces."""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+CHART_RANGES = {"1Y": pd.DateOffset(years=1), "3Y": pd.DateOffset(years=3), "5Y": pd.DateOffset(years=5), "Max": None}
+MAX_POINTS = 1500
+
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of threshold points that keep the line's shape
+
+    x and y are equal-length numeric arrays with x increasing. The first and
+    last points are always kept. Each bucket keeps the point forming the
+    largest triangle with the neighbouring buckets' averages (the previous
+    bucket's average stands in for the previously selected point, which lets
+    every bucket be scored at once instead of in a sequential loop).
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    starts, sizes = edges[:-1], np.diff(edges)
+    finite = np.isfinite(y)
+    y0 = np.where(finite, y, 0.0)
+    counts = np.add.reduceat(finite[:n - 1].astype(float), starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = np.add.reduceat(x[:n - 1], starts) / sizes
+        mean_y = np.add.reduceat(y0[:n - 1], starts) / counts
+    # Anchors: previous bucket's average (the first point for bucket 0); targets: next bucket's (the last point)
+    ax, ay = np.concatenate(([x[0]], mean_x[:-1])), np.concatenate(([y0[0]], mean_y[:-1]))
+    nx, ny = np.concatenate((mean_x[1:], [x[-1]])), np.concatenate((mean_y[1:], [y0[-1]]))
+    bucket = np.repeat(np.arange(len(starts)), sizes)
+    xs, ys = x[1:n - 1], y[1:n - 1]
+    ay, ny = np.where(np.isfinite(ay), ay, ys[starts - 1]), np.where(np.isfinite(ny), ny, ay)
+    area = np.abs((ax[bucket] - nx[bucket]) * (ys - ay[bucket]) - (ax[bucket] - xs) * (ny[bucket] - ay[bucket]))
+    area = np.where(np.isfinite(area), area, -np.inf)
+    # Sorting by (bucket, area) leaves each bucket in its own slot range with its best point last
+    order = np.lexsort((area, bucket))
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    selected[1:-1] = order[starts - 1 + sizes - 1] + 1
+    return selected
+
+
+def downsample(series, threshold=MAX_POINTS):
+    """LTTB-downsample a date-indexed series to at most threshold points"""
+    if len(series) <= threshold:
+        return series
+    x = series.index.asi8 if isinstance(series.index, pd.DatetimeIndex) else np.arange(len(series))
+    return series.iloc[lttb_indices(x, series.to_numpy(dtype=float), threshold)]
+
+
+def window_start(index, chart_range):
+    """First date shown for a CHART_RANGES key, or None for the full history"""
+    offset = CHART_RANGES.get(chart_range)
+    if offset is None or not len(index):
+        return None
+    return index[-1] - offset
+
+
+def build_performance_figure(values, goal, goal_pct, benchmark=None, benchmark_ticker=None, bench_return=None,
+                             chart_range="Max", max_points=MAX_POINTS, webgl=False):
+    """Portfolio vs goal path (and optional benchmark) figure for the visible range
+
+    Each series is cut to the selected range first and then downsampled, so
+    zooming into a shorter range keeps full daily detail there. goal must
+    share values' dates; it is sampled at the dates kept for values.
+    """
+    start = window_start(values.index, chart_range)
+    series = [values, goal] + ([benchmark] if benchmark is not None else [])
+    if start is not None:
+        series = [s[s.index >= start] for s in series]
+    series[0] = downsample(series[0], max_points)
+    # The goal path is a smooth closed-form curve: read it at the portfolio's kept dates instead of downsampling it
+    series[1] = series[1].reindex(series[0].index)
+    if benchmark is not None:
+        series[2] = downsample(series[2], max_points)
+    scatter = go.Scattergl if webgl else go.Scatter
+
+    fig = go.Figure()
+
+    # Actual portfolio
+    fig.add_trace(scatter(
+        x=series[0].index,
+        y=series[0].to_numpy(),
+        name='Actual Portfolio',
+        line=dict(color='#3b82f6', width=3),
+        fill='tozeroy',
+        fillcolor='rgba(59, 130, 246, 0.1)',
+        hovertemplate='<b>Date:</b> %{x|%Y-%m-%d}<br>' +
+                      '<b>Portfolio Value:</b> $%{y:,.2f}<br>' +
+                      '<b>Performance:</b> Actual<br>' +
+                      '<extra></extra>'
+    ))
+
+    # Goal path
+    fig.add_trace(scatter(
+        x=series[1].index,
+        y=series[1].to_numpy(),
+        name=f'Goal Path ({goal_pct}%/yr)',
+        line=dict(color='#10b981', width=2, dash='dash'),
+        hovertemplate='<b>Date:</b> %{x|%Y-%m-%d}<br>' +
+                      '<b>Target Value:</b> $%{y:,.2f}<br>' +
+                      f'<b>Goal Rate:</b> {goal_pct}% annually<br>' +
+                      '<extra></extra>'
+    ))
+
+    # Benchmark comparison (100% invested in benchmark)
+    if benchmark is not None:
+        fig.add_trace(scatter(
+            x=series[2].index,
+            y=series[2].to_numpy(),
+            name=f'100% in {benchmark_ticker} ({bench_return:+.1f}%)',
+            line=dict(color='#f59e0b', width=2, dash='dot'),
+            hovertemplate='<b>Date:</b> %{x|%Y-%m-%d}<br>' +
+                          '<b>Value if 100% in Benchmark:</b> $%{y:,.2f}<br>' +
+                          f'<b>Benchmark:</b> {benchmark_ticker}<br>' +
+                          f'<b>Total Return:</b> {bench_return:+.1f}%<br>' +
+                          '<extra></extra>'
+        ))
+
+    fig.update_layout(
+        hovermode='x unified',
+        plot_bgcolor='white',
+        height=550,
+        hoverlabel=dict(
+            bgcolor="white",
+            font_size=14,
+            font_family="Inter, sans-serif",
+            bordercolor="#e2e8f0"
+        ),
+        xaxis=dict(
+            showgrid=True,
+            gridcolor='#f1f5f9',
+            title='Date',
+            title_font=dict(size=14, color='#64748b')
+        ),
+        yaxis=dict(
+            showgrid=True,
+            gridcolor='#f1f5f9',
+            title='Portfolio Value ($)',
+            title_font=dict(size=14, color='#64748b')
+        ),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1,
+            font=dict(size=12)
+        ),
+        margin=dict(l=60, r=40, t=40, b=60)
+    )
+    return fig
+
+
+class FigureCache:
+    """Process-wide LRU of built figures keyed on everything that shapes the chart
+
+    Reruns that don't touch the chart inputs (tolerance updates, sidebar
+    edits, page navigation) get the same Figure object back instead of
+    re-slicing, re-downsampling and re-building every trace.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def figure(self, key, build):
+        """Return the cached figure for key, calling build() on a miss"""
+        with self._lock:
+            fig = self._entries.get(key)
+            if fig is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return fig
+        self.stats["misses"] += 1
+        fig = build()
+        with self._lock:
+            self._entries[key] = fig
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fig
+
+
+def series_version(series, version):
+    """Fingerprint of a date-indexed series for figure keys
+
+    version is the data version of the closes behind it (metrics.data_version
+    or PortfolioValuation.version), which changes when a re-base rewrites
+    earlier bars; length, end points and last value cover a grown tail.
+    """
+    if series is None or not len(series):
+        return None
+    return version, len(series), series.index[0], series.index[-1], float(series.iloc[-1])
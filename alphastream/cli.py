@@ -0,0 +1,110 @@
+"""Headless drift scans and rebalance reports over every profile.
+
+    python -m alphastream.cli drift --format csv --output drift.csv
+    python -m alphastream.cli rebalance --format json --workers 8
+    python -m alphastream.cli rebalance --cash-flow 1000
+
+Profiles are split into chunks evaluated in a process pool; prices are
+fetched once up front through the configured market data provider.
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from alphastream.core import action_labels, batch_trades, scan_profiles
+from alphastream.db import DB_FILE, WealthDB
+from alphastream.planner import PricePlan
+from alphastream.providers import get_provider
+
+
+def drift_report(profiles, prices):
+    """Dashboard drift scan as a flat report, one row per profile"""
+    summary, holdings = scan_profiles(profiles, prices)
+    breaching = holdings[holdings["breach"]].groupby("profile")["ticker"].agg(", ".join)
+    report = summary.copy()
+    report["breaching_assets"] = breaching.reindex(report.index).fillna("")
+    return report.reset_index()
+
+
+def rebalance_report(profiles, prices, cash_flow=None):
+    """Rebalance Analysis rows for every priced holding
+
+    Trades go back to target, or with cash_flow, route that contribution
+    (> 0) or withdrawal (< 0) through every profile in one pass.
+    """
+    summary, holdings = scan_profiles(profiles, prices)
+    tolerance = pd.Series({n: float(p.get("drift_tolerance", 5.0)) for n, p in profiles.items()})
+    rows = batch_trades(summary, holdings, list(summary.index[summary["value"] != 0]), cash_flow)
+    rows["breach"] = np.abs(rows["drift"].to_numpy()) >= tolerance.reindex(rows["profile"]).to_numpy()
+    # Same profile-level flag as the drift report, so never-rebalanced profiles count too
+    rows["needs_rebalance"] = summary["needs_rebalance"].reindex(rows["profile"]).to_numpy()
+    # From the trade itself (cent-rounded), not the drift: a cash flow can leave an overweight asset untouched
+    rows["action"] = action_labels(-np.sign(rows["trade_value"].round(2).to_numpy()), hold_below=0.5)
+    return rows
+
+
+REPORTS = {"drift": drift_report, "rebalance": rebalance_report}
+
+
+def _run_chunk(args):
+    report, profiles, prices, options = args
+    return REPORTS[report](profiles, prices, **options)
+
+
+def run_report(report, profiles, prices, workers=1, chunk_size=250, cash_flow=None):
+    """Evaluate report over profiles, in a process pool when workers > 1"""
+    names = list(profiles)
+    chunks = [
+        {n: profiles[n] for n in names[i:i + chunk_size]}
+        for i in range(0, len(names), chunk_size)
+    ]
+    options = {"cash_flow": cash_flow} if report == "rebalance" else {}
+    tasks = [(report, chunk, prices, options) for chunk in chunks]
+    if workers <= 1 or len(chunks) <= 1:
+        frames = [_run_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(_run_chunk, tasks))
+    frames = [f for f in frames if not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="alphastream", description=__doc__.splitlines()[0])
+    parser.add_argument("report", choices=sorted(REPORTS))
+    parser.add_argument("--db", default=DB_FILE, help="profile database path")
+    parser.add_argument("--format", choices=["csv", "json"], default="csv")
+    parser.add_argument("--output", help="write the report here instead of stdout")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=250, help="profiles per worker task")
+    parser.add_argument("--cash-flow", type=float, help="rebalance report: contribution (+) or withdrawal (-) per profile")
+    parser.add_argument("--fail-on-drift", action="store_true", help="exit 1 when any profile needs rebalancing")
+    args = parser.parse_args(argv)
+
+    profiles = WealthDB(args.db).load()[0]["profiles"]
+    plan = PricePlan().add("holding", sorted({t for p in profiles.values() for t in p.get("assets", {})}))
+    prices = plan.quotes(get_provider().quotes) if plan.symbols() else {}
+    report = run_report(args.report, profiles, prices, workers=args.workers, chunk_size=args.chunk_size, cash_flow=args.cash_flow)
+
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        if args.format == "csv":
+            report.to_csv(out, index=False)
+        else:
+            out.write(report.to_json(orient="records", indent=2))
+            out.write("\n")
+    finally:
+        if args.output:
+            out.close()
+
+    if args.fail_on_drift:
+        return 1 if report.get("needs_rebalance", pd.Series(dtype=bool)).any() else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""Pure computation core: valuation, drift, growth metrics, goal path and trades.
+
+Nothing here touches Streamlit, the network or the database, so every
+function can be reused by the CLI, batch jobs and benchmarks.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from alphastream.drift import RECENT_REBALANCE_HOURS, drift_details, scan_profiles
+from alphastream.lots import SELL_METHODS, LotBook
+from alphastream.rebalance import band_weights, round_lots, route_cash_flow
+from alphastream.valuation import PortfolioValuation
+
+__all__ = [
+    "LotBook",
+    "PortfolioMetrics",
+    "PortfolioValuation",
+    "SELL_METHODS",
+    "action_labels",
+    "batch_trades",
+    "band_weights",
+    "buy_guide",
+    "cagr_pct",
+    "drift_details",
+    "execute_trades",
+    "goal_path",
+    "goal_value",
+    "is_recently_rebalanced",
+    "normalize_benchmark",
+    "portfolio_metrics",
+    "rebalance_activity",
+    "rebalance_profile",
+    "rebalance_trades",
+    "roi_pct",
+    "round_lots",
+    "route_cash_flow",
+    "scan_profiles",
+    "sell_lots",
+    "trade_record",
+    "years_between",
+]
+
+MIN_YEARS = 0.01
+
+
+def years_between(start: date, end: date) -> float:
+    """Elapsed years (365.25-day), floored at MIN_YEARS to keep CAGR finite"""
+    return max((end - start).days / 365.25, MIN_YEARS)
+
+
+def is_recently_rebalanced(last_rebalanced: Optional[str], now: Optional[datetime] = None) -> bool:
+    """Whether a "%Y-%m-%d %H:%M:%S" timestamp is within the last 24 hours"""
+    if not last_rebalanced:
+        return False
+    try:
+        last = datetime.strptime(last_rebalanced, "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return False
+    return ((now or datetime.now()) - last).total_seconds() / 3600 < RECENT_REBALANCE_HOURS
+
+
+def roi_pct(current: float, principal: float) -> float:
+    return ((current / principal) - 1) * 100 if principal > 0 else 0.0
+
+
+def cagr_pct(current: float, principal: float, years: float) -> float:
+    return ((current / principal) ** (1 / years) - 1) * 100 if principal > 0 and years > 0 else 0.0
+
+
+def goal_value(principal: float, yearly_goal_pct: float, years: float) -> float:
+    """Target value after compounding the yearly goal for years"""
+    return principal * (1 + yearly_goal_pct / 100) ** years
+
+
+def goal_path(principal: float, yearly_goal_pct: float, n_points: int) -> np.ndarray:
+    """Goal path compounded daily at the yearly rate, one step per chart point"""
+    daily_rate = (yearly_goal_pct / 100) / 365.25
+    return principal * (1 + daily_rate) ** np.arange(n_points)
+
+
+def normalize_benchmark(closes: pd.Series, principal: float) -> pd.Series:
+    """Value of principal invested entirely in the benchmark at its first close"""
+    return closes / float(closes.iloc[0]) * principal
+
+
+def buy_guide(target_pct: float, principal: float, price: float) -> tuple[float, float]:
+    """Return (target value, units to buy) for a target weight of the principal"""
+    target_value = (target_pct / 100) * principal
+    return target_value, target_value / price
+
+
+@dataclass(frozen=True)
+class PortfolioMetrics:
+    current_value: float
+    roi: float
+    cagr: float
+    vs_goal: float
+    annualized: float
+    history_years: float
+
+
+def portfolio_metrics(
+    values: pd.Series,
+    principal: float,
+    yearly_goal_pct: float,
+    start_date: date,
+    today: Optional[date] = None,
+) -> PortfolioMetrics:
+    """Headline Portfolio Manager metrics from a daily value series
+
+    CAGR is measured from the profile's inception date to today; the goal
+    comparison and annualized return use the span of the price history.
+    """
+    current = float(values.iloc[-1])
+    history_years = years_between(values.index[0], values.index[-1])
+    return PortfolioMetrics(
+        current_value=current,
+        roi=roi_pct(current, principal),
+        cagr=cagr_pct(current, principal, years_between(start_date, today or date.today())),
+        vs_goal=((current / goal_value(principal, yearly_goal_pct, history_years)) - 1) * 100,
+        annualized=cagr_pct(current, principal, history_years),
+        history_years=history_years,
+    )
+
+
+def action_labels(drift: np.ndarray, hold_below: float = 0.1) -> np.ndarray:
+    """BUY/SELL per asset from signed drift; "—" when within hold_below points"""
+    return np.where(np.abs(drift) < hold_below, "—", np.where(drift < 0, "BUY", "SELL"))
+
+
+def rebalance_trades(
+    valuation: PortfolioValuation,
+    lot_size: Optional[float] = None,
+    tolerance: Optional[float] = None,
+    inner_band: Optional[float] = None,
+    cash_flow: Optional[float] = None,
+) -> pd.DataFrame:
+    """Rebalance Analysis trades, one typed row per valued asset
+
+    By default every asset trades back to target. With tolerance, only
+    assets drifted past it trade, and only back to the edge of the inner
+    band (see band_weights). With cash_flow, a contribution (> 0) only buys
+    and a withdrawal (< 0) only sells, routed to the most under/overweight
+    assets first (see route_cash_flow). With lot_size, the target units of
+    trading assets are rounded to whole lots by round_lots; the uninvested
+    remainder is value.sum() + cash_flow - (target_units * price).sum().
+    """
+    if cash_flow is not None:
+        target_units = route_cash_flow(valuation.positions[-1], valuation.targets, cash_flow) / valuation.last_prices
+    else:
+        targets = None
+        if tolerance is not None:
+            targets = band_weights(valuation.current_weights, valuation.targets, tolerance, inner_band)
+        target_units = valuation.rebalance_plan(targets)["target_units"]
+    if lot_size:
+        # Only assets that actually trade are rounded, so held fractional units aren't churned
+        moving = ~np.isclose(target_units, valuation.units)
+        target_units = target_units.copy()
+        target_units[moving], _ = round_lots(target_units[moving], valuation.last_prices[moving], lot_size)
+    unit_diff = target_units - valuation.units
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily_change = (valuation.last_prices / valuation.prev_prices - 1) * 100
+    return pd.DataFrame({
+        "ticker": valuation.symbols,
+        "units": valuation.units,
+        "price": valuation.last_prices,
+        "daily_change": daily_change,
+        "value": valuation.positions[-1],
+        "weight": valuation.current_weights,
+        "target": valuation.targets,
+        "drift": valuation.drift,
+        "action": action_labels(valuation.drift),
+        "target_units": target_units,
+        "trade_value": unit_diff * valuation.last_prices,
+        "trade_units": unit_diff,
+    })
+
+
+def sell_lots(
+    book: LotBook,
+    trades: pd.DataFrame,
+    method: str = "FIFO",
+    today: Optional[date] = None,
+) -> tuple[LotBook, pd.DataFrame]:
+    """Lots consumed by the SELL rows of rebalance_trades under method
+
+    Returns (book after the sells, per-lot sales with realized gain).
+    """
+    sells = trades[trades["trade_units"] < 0]
+    prices = dict(zip(trades["ticker"], trades["price"]))
+    return book.sell(dict(zip(sells["ticker"], -sells["trade_units"])), prices, method, today)
+
+
+def execute_trades(
+    book: LotBook,
+    trades: pd.DataFrame,
+    method: str = "FIFO",
+    today: Optional[date] = None,
+) -> tuple[dict, LotBook, pd.DataFrame]:
+    """Apply one profile's rebalance_trades or batch_trades rows to its units and lots
+
+    book should already hold the profile's current units. SELL rows close
+    lots under method and BUY rows open a lot today at the row's price.
+    Returns (units per ticker after the trades, book after, per-lot sales).
+    """
+    book, sales = sell_lots(book, trades, method, today)
+    buys = trades[trades["trade_units"] > 1e-9]
+    opened = np.datetime64(str(today or date.today())[:10], "D")
+    book = book.add(buys["ticker"], np.full(len(buys), opened), buys["trade_units"], buys["price"])
+    units = dict(zip(trades["ticker"], trades["target_units"].astype(float)))
+    return units, book, sales
+
+
+def batch_trades(
+    summary: pd.DataFrame,
+    holdings: pd.DataFrame,
+    names: Optional[list] = None,
+    cash_flow: Optional[float] = None,
+) -> pd.DataFrame:
+    """Trades for many profiles from one scan_profiles result
+
+    Defaults to every profile flagged needs_rebalance. Trades go back to
+    target, or with cash_flow, route that contribution (> 0) or withdrawal
+    (< 0) through each profile in one pass (see route_cash_flow). Rows carry
+    the profile plus the rebalance_trades columns that trade_record reads.
+    """
+    names = list(summary.index[summary["needs_rebalance"]]) if names is None else names
+    rows = holdings[holdings["profile"].isin(names) & (holdings["price"] > 0)].copy()
+    if cash_flow is not None:
+        groups, profiles = pd.factorize(rows["profile"])
+        flows = np.full(len(profiles), float(cash_flow))
+        rows["trade_value"] = route_cash_flow(rows["value"].to_numpy(), rows["target"].to_numpy(), flows, groups) - rows["value"].to_numpy()
+    else:
+        profile_value = summary["value"].reindex(rows["profile"]).to_numpy()
+        rows["trade_value"] = rows["target"].to_numpy() / 100 * profile_value - rows["value"].to_numpy()
+    rows["trade_units"] = rows["trade_value"] / rows["price"]
+    rows["target_units"] = rows["units"] + rows["trade_units"]
+    return rows.reset_index(drop=True)
+
+
+def trade_record(trades: pd.DataFrame, mode: str = "target", min_units: float = 0.0001) -> dict:
+    """Structured record of one profile's executed trades for the journal payload
+
+    Each trade keeps side, units, price, value and the asset's drift before and
+    after, measured against the post-trade weights.
+    """
+    after = (trades["target_units"] * trades["price"]).to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drift_after = after / after.sum() * 100 - trades["target"].to_numpy(dtype=float)
+    moved = (trades["trade_units"].abs() > min_units).to_numpy()
+    return {
+        "mode": mode,
+        "turnover": float(trades["trade_value"].abs().sum()),
+        "trades": [
+            {
+                "ticker": t,
+                "side": "BUY" if u > 0 else "SELL",
+                "units": float(abs(u)),
+                "price": float(p),
+                "value": float(abs(v)),
+                "drift_before": float(d),
+                "drift_after": float(da),
+            }
+            for t, u, p, v, d, da in zip(
+                trades["ticker"][moved], trades["trade_units"][moved], trades["price"][moved],
+                trades["trade_value"][moved], trades["drift"][moved], drift_after[moved],
+            )
+        ],
+    }
+
+
+def rebalance_activity(mode: str, record: dict, profile: dict) -> str:
+    """Activity Log line describing what a rebalance of the given mode did"""
+    if mode == "band":
+        return f"Brought {len(record['trades'])} drifted asset(s) back inside the {profile.get('drift_tolerance', 5.0)}% band"
+    if mode == "cash_flow":
+        flow = sum(x["value"] if x["side"] == "BUY" else -x["value"] for x in record["trades"])
+        kind = "contribution" if flow >= 0 else "withdrawal"
+        return f"Routed a ${abs(flow):,.2f} {kind} through {len(record['trades'])} asset(s)"
+    return "Portfolio rebalanced to target allocations - Status: Balanced"
+
+
+def rebalance_profile(
+    name: str,
+    profile: dict,
+    trades: pd.DataFrame,
+    book: LotBook,
+    mode: str = "target",
+    method: str = "FIFO",
+    cash_flow: Optional[float] = None,
+    now: Optional[datetime] = None,
+) -> tuple[list, LotBook]:
+    """Apply one profile's trades to its dict and lots; return (journal events, book after)
+
+    Units move to the trades' target units and last_rebalanced is stamped.
+    A cash flow also moves the principal, since new money (or money taken
+    out) changes what ROI and the goal path measure against. The events
+    (a rebalance record and an activity line) and the book are meant for a
+    single WealthDB.save so everything lands together. When no trade clears
+    the record's minimum size nothing is applied and there are no events.
+    """
+    record = trade_record(trades, mode)
+    if not record["trades"]:
+        return [], book
+    now = now or datetime.now()
+    ts = now.strftime("%Y-%m-%d %H:%M:%S")
+    note = ""
+    if cash_flow:
+        profile["principal"] = max(float(profile["principal"]) + cash_flow, 0.0)
+        note = f"💵 Cash flow {cash_flow:+,.2f}: "
+    units, book, _ = execute_trades(book, trades, method, now.date())
+    for t, u in units.items():
+        profile["assets"][t]["units"] = u
+    profile["last_rebalanced"] = ts
+    changes = [f"{'🟢' if x['side'] == 'BUY' else '🔴'} {x['ticker']} {x['side']} {x['units']:.4f}" for x in record["trades"]]
+    events = [
+        (name, "rebalance", ts, note + ", ".join(changes), record),
+        (name, "activity", ts, rebalance_activity(mode, record, profile)),
+    ]
+    return events, book
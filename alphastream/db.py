@@ -0,0 +1,529 @@
+"""SQLite persistence for profiles with per-profile row updates.
+
+Each profile is one JSON row, so a save only rewrites the profiles that
+changed, inside a single transaction. An existing alphastream_wealth.json
+is migrated on first open and left in place untouched.
+
+Activity and rebalance history live in an append-only events table instead
+of inside the profile rows, so logging never rewrites a profile.
+
+Tax lots live in their own table (see LotLedger) and are read back as a
+columnar LotBook per profile. Executed trades are also kept one row per
+trade (see TradeLedger) so history can be aggregated without parsing text.
+
+Every row carries a version number. Sessions keep the version they loaded
+and saves compare-and-swap against it, merging edits to different fields
+when another session saved the same profile in between.
+"""
+import json
+import os
+import re
+import sqlite3
+from datetime import date, datetime
+
+import pandas as pd
+
+from alphastream.lots import LotBook
+
+DB_FILE = "alphastream_wealth.db"
+LEGACY_JSON = "alphastream_wealth.json"
+
+
+def apply_defaults(profile):
+    """Fill in fields added after a profile was first written"""
+    profile.setdefault("drift_tolerance", 5.0)
+    profile.setdefault("last_rebalanced", None)
+    profile.setdefault("benchmark", None)
+    return profile
+
+
+def dump(value):
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+class WealthDB:
+    """Profile database; load() returns the app's {"profiles", "global_logs"} schema"""
+
+    def __init__(self, path=DB_FILE, legacy_json=LEGACY_JSON):
+        self.path = path
+        self.migration_error = None
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS profiles (
+                    name TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 1
+                )
+            """)
+            columns = [r[1] for r in conn.execute("PRAGMA table_info(profiles)")]
+            if "version" not in columns:
+                conn.execute("ALTER TABLE profiles ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.journal = EventJournal(path)
+        self.lots = LotLedger(path)
+        if legacy_json and os.path.exists(legacy_json):
+            self.migrate_json(legacy_json)
+        self.migrate_logs()
+        # After the log migration, so legacy rebalance_stats text is backfilled too
+        self.trades = TradeLedger(path)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def migrate_json(self, json_path):
+        """Import a legacy JSON database once
+
+        A corrupt file is left alone and not imported; the reason is kept in
+        migration_error so the app can tell the user their data is missing.
+        """
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from'").fetchone():
+                return False
+            with open(json_path, "r") as f:
+                try:
+                    legacy = json.load(f)
+                except ValueError as e:
+                    self.migration_error = f"{os.path.abspath(json_path)} could not be read ({e}) and was not imported"
+                    return False
+            now = datetime.now().isoformat(timespec="seconds")
+            conn.executemany(
+                "INSERT OR IGNORE INTO profiles VALUES (?, ?, ?, 1)",
+                [(name, dump(apply_defaults(p)), now) for name, p in legacy.get("profiles", {}).items()]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('global_logs', ?)", (dump(legacy.get("global_logs", [])),)
+            )
+            conn.execute("INSERT INTO meta VALUES ('migrated_from', ?)", (os.path.abspath(json_path),))
+        return True
+
+    def migrate_logs(self):
+        """Move rebalance_logs / rebalance_stats lists out of profile rows into the journal"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT name, version, data FROM profiles "
+                "WHERE data LIKE '%\"rebalance_logs\"%' OR data LIKE '%\"rebalance_stats\"%'"
+            ).fetchall()
+            for name, version, text in rows:
+                profile = json.loads(text)
+                logs = profile.pop("rebalance_logs", None) or []
+                stats = profile.pop("rebalance_stats", None) or []
+                events = [("activity", e.get("date", ""), e.get("event", "")) for e in logs]
+                for entry in stats:
+                    stamp, _, event = str(entry).partition(" - ")
+                    events.append(("rebalance", stamp, event or stamp))
+                # Lists were newest first; journal ids ascend with time
+                self.journal.extend(conn, [(name, kind, ts, event) for kind, ts, event in reversed(events)])
+                conn.execute(
+                    "UPDATE profiles SET data = ?, version = ? WHERE name = ?", (dump(profile), version + 1, name)
+                )
+        return bool(rows)
+
+    def load(self):
+        """Return (data, snapshot); pass snapshot back to save() to detect changes"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT name, version, data FROM profiles ORDER BY rowid").fetchall()
+            logs = conn.execute("SELECT value FROM meta WHERE key = 'global_logs'").fetchone()
+        data = {
+            "profiles": {name: apply_defaults(json.loads(text)) for name, _, text in rows},
+            "global_logs": json.loads(logs[0]) if logs else [],
+        }
+        snapshot = {name: (version, dump(data["profiles"][name])) for name, version, _ in rows}
+        snapshot[None] = (0, dump(data["global_logs"]))
+        return data, snapshot
+
+    def refresh(self, data, snapshot):
+        """Pull in profiles other sessions changed since snapshot; return the new snapshot
+
+        Profiles with unsaved local edits are left alone; save() merges them.
+        """
+        with self._connect() as conn:
+            versions = dict(conn.execute("SELECT name, version FROM profiles").fetchall())
+            stale = [
+                name for name, version in versions.items()
+                if name not in snapshot or snapshot[name][0] != version
+            ]
+            rows = conn.execute(
+                f"SELECT name, version, data FROM profiles WHERE name IN ({','.join('?' * len(stale))})", stale
+            ).fetchall() if stale else []
+        deleted = [n for n in snapshot if n is not None and n not in versions]
+        if not rows and not deleted:
+            # Unchanged snapshots keep their identity so callers can cache on it
+            return snapshot
+        snapshot = dict(snapshot)
+        profiles = data["profiles"]
+        for name, version, text in rows:
+            local = profiles.get(name)
+            if local is not None and name in snapshot and dump(local) != snapshot[name][1]:
+                continue
+            profiles[name] = apply_defaults(json.loads(text))
+            snapshot[name] = (version, dump(profiles[name]))
+        for name in deleted:
+            if name in profiles and dump(profiles[name]) == snapshot[name][1]:
+                del profiles[name]
+            del snapshot[name]
+        return snapshot
+
+    def save(self, data, snapshot, events=(), lots=None):
+        """Compare-and-swap every changed profile under one write lock; return the new snapshot
+
+        A profile whose stored version moved since snapshot is three-way merged
+        with the stored copy; overlapping edits raise ConflictError and nothing
+        is written. On success data is updated in place with the merged profiles.
+        events (journal tuples, see EventJournal.extend) and lots ({profile:
+        LotBook}) are written in the same transaction, so executed trades,
+        their records and the lots they touched land together or not at all.
+
+        A book replaces all of a profile's lots, so it cannot be merged: lots
+        for a profile whose version moved raise ConflictError, and writing
+        lots bumps the profile's version even when its data is unchanged.
+        """
+        profiles = data["profiles"]
+        lots = lots or {}
+        current = {name: dump(p) for name, p in profiles.items()}
+        logs_text = dump(data.get("global_logs", []))
+        changed = [n for n, text in current.items() if n not in snapshot or snapshot[n][1] != text]
+        removed = [n for n in snapshot if n is not None and n not in current]
+        if not changed and not removed and snapshot[None][1] == logs_text and not events and not lots:
+            return snapshot
+
+        now = datetime.now().isoformat(timespec="seconds")
+        snapshot = dict(snapshot)
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for name in changed:
+                row = conn.execute("SELECT version, data FROM profiles WHERE name = ?", (name,)).fetchone()
+                if name not in snapshot:
+                    if row is not None:
+                        raise ConflictError(name, "was created in another session")
+                    version = 1
+                else:
+                    base_version, base_text = snapshot[name]
+                    if row is None:
+                        raise ConflictError(name, "was deleted in another session")
+                    if row[0] != base_version:
+                        if name in lots:
+                            raise ConflictError(name, "was changed in another session while its lots were being updated")
+                        merged = merge(json.loads(base_text), json.loads(row[1]), profiles[name], name)
+                        profiles[name] = apply_defaults(merged)
+                        current[name] = dump(profiles[name])
+                    version = row[0] + 1
+                conn.execute(
+                    "INSERT INTO profiles VALUES (?, ?, ?, ?) ON CONFLICT(name) DO UPDATE SET "
+                    "data = excluded.data, updated_at = excluded.updated_at, version = excluded.version",
+                    (name, current[name], now, version)
+                )
+                snapshot[name] = (version, current[name])
+            for name in removed:
+                row = conn.execute("SELECT version FROM profiles WHERE name = ?", (name,)).fetchone()
+                if row is not None and row[0] != snapshot[name][0]:
+                    raise ConflictError(name, "was changed in another session before it could be deleted")
+                conn.execute("DELETE FROM profiles WHERE name = ?", (name,))
+                # A profile re-created under the same name starts without the old lots
+                conn.execute("DELETE FROM lots WHERE profile = ?", (name,))
+                conn.execute("DELETE FROM meta WHERE key = ?", (f"lots_backfilled:{name}",))
+                del snapshot[name]
+            if snapshot[None][1] != logs_text:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'global_logs'").fetchone()
+                stored = json.loads(row[0]) if row else []
+                data["global_logs"] = merge_lists(json.loads(snapshot[None][1]), stored, data.get("global_logs", []))
+                logs_text = dump(data["global_logs"])
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('global_logs', ?)", (logs_text,))
+                snapshot[None] = (0, logs_text)
+            ids = EventJournal.extend(conn, events)
+            TradeLedger.extend(conn, events, ids)
+            for name, book in lots.items():
+                if name not in changed:
+                    row = conn.execute("SELECT version FROM profiles WHERE name = ?", (name,)).fetchone()
+                    if row is None or name not in snapshot or row[0] != snapshot[name][0]:
+                        raise ConflictError(name, "was changed in another session while its lots were being updated")
+                    conn.execute("UPDATE profiles SET version = ?, updated_at = ? WHERE name = ?", (row[0] + 1, now, name))
+                    snapshot[name] = (row[0] + 1, snapshot[name][1])
+                LotLedger.write(conn, name, book)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return snapshot
+
+
+class EventJournal:
+    """Append-only per-profile event log with indexed time-range and paginated reads
+
+    kind is "activity" (the sidebar Activity Log) or "rebalance" (Rebalance
+    History Details). Timestamps are "YYYY-MM-DD HH:MM[:SS]" strings.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    profile TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    ts TEXT NOT NULL,
+                    event TEXT NOT NULL,
+                    payload TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS events_profile_kind_ts ON events (profile, kind, ts)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def extend(conn, events):
+        """Insert (profile, kind, ts, event[, payload]) tuples on an open connection; return their ids"""
+        ids = []
+        for e in events:
+            cur = conn.execute(
+                "INSERT INTO events (profile, kind, ts, event, payload) VALUES (?, ?, ?, ?, ?)",
+                (*e[:4], dump(e[4]) if len(e) > 4 and e[4] is not None else None)
+            )
+            ids.append(cur.lastrowid)
+        return ids
+
+    def append(self, profile, kind, event, payload=None, ts=None):
+        ts = ts or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        events = [(profile, kind, ts, str(event), payload)]
+        with self._connect() as conn:
+            TradeLedger.extend(conn, events, self.extend(conn, events))
+
+    def _where(self, profile, kind, since, until):
+        clause, params = "profile = ? AND kind = ?", [profile, kind]
+        if since:
+            clause += " AND ts >= ?"
+            params.append(str(since))
+        if until:
+            clause += " AND ts < ?"
+            params.append(str(until))
+        return clause, params
+
+    def count(self, profile, kind, since=None, until=None):
+        clause, params = self._where(profile, kind, since, until)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM events WHERE {clause}", params).fetchone()[0]
+
+    def page(self, profile, kind, limit=20, offset=0, since=None, until=None):
+        """Return events newest first as {"date", "event", "payload"} dicts"""
+        clause, params = self._where(profile, kind, since, until)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT ts, event, payload FROM events WHERE {clause} ORDER BY ts DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [{"date": ts, "event": event, "payload": json.loads(p) if p else None} for ts, event, p in rows]
+
+
+class TradeLedger:
+    """One row per executed trade, read back as a typed column frame
+
+    Rows come from the structured payload of "rebalance" journal events and
+    point back at their event, so one event is one rebalance. Rebalance
+    events without trade rows are backfilled on every open: structured
+    payloads in full, legacy "🟢 AAA BUY 1.0000" text with units and side
+    only. That covers events written before the table existed and legacy
+    JSON imported on a later start; an event that already has rows is
+    never backfilled again.
+    """
+
+    COLUMNS = ["event_id", "profile", "ts", "ticker", "side", "units", "price", "value", "drift_before", "drift_after"]
+    LEGACY_TRADE = re.compile(r"(\S+) (BUY|SELL) ([0-9.]+)")
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS trades (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    event_id INTEGER NOT NULL,
+                    profile TEXT NOT NULL,
+                    ts TEXT NOT NULL,
+                    ticker TEXT NOT NULL,
+                    side TEXT NOT NULL,
+                    units REAL NOT NULL,
+                    price REAL,
+                    value REAL,
+                    drift_before REAL,
+                    drift_after REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS trades_profile_ts ON trades (profile, ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS trades_event ON trades (event_id)")
+            self.backfill(conn)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def extend(conn, events, ids):
+        """Insert the trades carried by rebalance events just written with the given event ids"""
+        rows = [
+            (event_id, e[0], e[2], t["ticker"], t["side"], t["units"], t.get("price"), t.get("value"),
+             t.get("drift_before"), t.get("drift_after"))
+            for event_id, e in zip(ids, events)
+            if e[1] == "rebalance" and len(e) > 4 and e[4]
+            for t in e[4].get("trades", [])
+        ]
+        conn.executemany(
+            "INSERT INTO trades (event_id, profile, ts, ticker, side, units, price, value, drift_before, drift_after) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+        )
+
+    def backfill(self, conn):
+        rows = []
+        events = conn.execute(
+            "SELECT id, profile, ts, event, payload FROM events WHERE kind = 'rebalance' "
+            "AND id NOT IN (SELECT event_id FROM trades) ORDER BY id"
+        ).fetchall()
+        for event_id, profile, ts, event, payload in events:
+            trades = json.loads(payload).get("trades", []) if payload else [
+                {"ticker": t, "side": side, "units": float(units)} for t, side, units in self.LEGACY_TRADE.findall(event)
+            ]
+            rows += [
+                (event_id, profile, ts, t["ticker"], t["side"], t["units"], t.get("price"), t.get("value"),
+                 t.get("drift_before"), t.get("drift_after"))
+                for t in trades
+            ]
+        conn.executemany(
+            "INSERT INTO trades (event_id, profile, ts, ticker, side, units, price, value, drift_before, drift_after) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+        )
+        return len(rows)
+
+    def frame(self, profile=None, since=None, until=None):
+        """Trades as a frame with a datetime ts column and float measures, oldest first"""
+        clause, params = "1 = 1", []
+        if profile is not None:
+            clause += " AND profile = ?"
+            params.append(profile)
+        if since:
+            clause += " AND ts >= ?"
+            params.append(str(since))
+        if until:
+            clause += " AND ts < ?"
+            params.append(str(until))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM trades WHERE {clause} ORDER BY ts, id", params
+            ).fetchall()
+        frame = pd.DataFrame(rows, columns=self.COLUMNS)
+        frame["ts"] = pd.to_datetime(frame["ts"], format="mixed", errors="coerce")
+        for column in ["units", "price", "value", "drift_before", "drift_after"]:
+            frame[column] = frame[column].astype(float)
+        return frame
+
+
+class LotLedger:
+    """Per-profile tax lots (ticker, acquisition date, units, per-unit cost, estimated flag)
+
+    Writing a profile's book marks it backfilled: from then on every unit
+    change writes its own lot, so the inception-dated opening lot for
+    holdings that predate lot tracking is only ever estimated once.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS lots (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    profile TEXT NOT NULL,
+                    ticker TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    units REAL NOT NULL,
+                    cost REAL,
+                    estimated INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            if "estimated" not in {row[1] for row in conn.execute("PRAGMA table_info(lots)")}:
+                conn.execute("ALTER TABLE lots ADD COLUMN estimated INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS lots_profile_ticker_date ON lots (profile, ticker, date)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def book(self, profile):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT ticker, date, units, cost, estimated FROM lots WHERE profile = ? ORDER BY ticker, date, id", (profile,)
+            ).fetchall()
+        return LotBook.from_rows(rows)
+
+    def backfilled(self, profile):
+        """Whether profile's pre-lot holdings already have their opening lots"""
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM meta WHERE key = ?", (f"lots_backfilled:{profile}",)).fetchone() is not None
+
+    def current(self, profile, assets, start_date, prices, opening_cost, today=None):
+        """profile's lots reconciled with the units in assets ({ticker: {"units", ...}})
+
+        Until the profile's lots are first saved, holdings that predate lot
+        tracking get one estimated opening lot at start_date, costed by
+        opening_cost() ({ticker: first close}, only called then). After that a
+        gap can only come from outside the app and opens a lot today at
+        prices[ticker]; tickers without a price are left as they are.
+        """
+        units = {t: float(a["units"]) for t, a in assets.items()}
+        book = self.book(profile)
+        if self.backfilled(profile):
+            return book.reconcile({t: u for t, u in units.items() if t in prices}, today or date.today(), prices)
+        if not units:
+            return book
+        return book.reconcile(units, start_date, opening_cost())
+
+    @staticmethod
+    def write(conn, profile, book):
+        """Replace a profile's lots with book's on an open connection"""
+        conn.execute("DELETE FROM lots WHERE profile = ?", (profile,))
+        conn.executemany(
+            "INSERT INTO lots (profile, ticker, date, units, cost, estimated) VALUES (?, ?, ?, ?, ?, ?)",
+            [(profile, *row) for row in book.rows()]
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO meta VALUES (?, ?)",
+            (f"lots_backfilled:{profile}", datetime.now().isoformat(timespec="seconds"))
+        )
+
+    def store(self, profile, book):
+        with self._connect() as conn:
+            self.write(conn, profile, book)
+
+
+class ConflictError(Exception):
+    """Raised when two sessions changed the same profile field differently"""
+
+    def __init__(self, profile, reason):
+        super().__init__(f"Profile '{profile}' {reason}")
+        self.profile = profile
+
+
+def merge_lists(base, theirs, ours):
+    """Profile lists are newest-first logs: put our new entries ahead of theirs"""
+    return [entry for entry in ours if entry not in base] + theirs
+
+
+def merge(base, theirs, ours, profile, path=()):
+    """Three-way merge of JSON values, recursing into dicts"""
+    if ours == base or ours == theirs:
+        return theirs
+    if theirs == base:
+        return ours
+    if isinstance(base, dict) and isinstance(theirs, dict) and isinstance(ours, dict):
+        merged = {}
+        for key in list(theirs) + [k for k in ours if k not in theirs]:
+            missing = object()
+            value = merge(base.get(key, missing), theirs.get(key, missing), ours.get(key, missing), profile, path + (key,))
+            if value is not missing:
+                merged[key] = value
+        return merged
+    if isinstance(base, list) and isinstance(theirs, list) and isinstance(ours, list):
+        return merge_lists(base, theirs, ours)
+    raise ConflictError(profile, f"has conflicting changes to {'.'.join(map(str, path)) or 'its data'}")
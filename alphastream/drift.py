@@ -0,0 +1,96 @@
+"""Batch drift scan over every profile in one vectorized pass."""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from alphastream.holdings import Holdings
+
+RECENT_REBALANCE_HOURS = 24
+
+
+def scan_profiles(profiles, prices, now=None):
+    """Evaluate value, ROI, CAGR, weights, drift and rebalance status for all profiles
+
+    profiles is the DB's profile dict or a prebuilt Holdings; prices maps
+    ticker -> last price and tickers without a price are valued at 0.
+    Returns (summary, holdings): summary is indexed by profile name, holdings
+    has one row per (profile, ticker) with its current and target weight.
+    Status follows the dashboard rules: never rebalanced profiles with assets
+    need a rebalance, recently rebalanced ones are balanced, otherwise any
+    asset at or past the drift tolerance flags the profile.
+    """
+    now = now or datetime.now()
+    book = profiles if isinstance(profiles, Holdings) else Holdings.from_profiles(profiles)
+    n = len(book)
+    profile_idx = book.profile_idx
+    price_vec = book.price_vector(prices)
+
+    positions = book.positions(price_vec)
+    values = book.profile_sum(positions)
+    asset_counts = book.asset_counts
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = positions / values[profile_idx] * 100
+    drift = weights - book.targets
+
+    hours_since = (np.datetime64(now) - book.last_rebalanced) / np.timedelta64(1, "h")
+    recently = ~np.isnan(hours_since) & (hours_since < RECENT_REBALANCE_HOURS)
+    has_rebalanced = book.has_rebalanced
+
+    checked = has_rebalanced & ~recently & (values != 0)
+    breach = (np.abs(drift) >= book.tolerance[profile_idx]) & checked[profile_idx]
+    breach_counts = book.profile_sum(breach).astype(int)
+    max_drift = np.zeros(n)
+    np.maximum.at(max_drift, profile_idx, np.where(breach, np.abs(drift), 0.0))
+    needs = (asset_counts > 0) & (values != 0) & (~has_rebalanced | (breach_counts > 0))
+
+    status = np.where(
+        ~has_rebalanced,
+        np.where(asset_counts > 0, "rebalance_required", "not_rebalanced"),
+        np.where(recently | (breach_counts == 0), "balanced", "rebalance_required")
+    )
+
+    principal = book.principal
+    years = np.maximum((np.datetime64(now.date()) - book.start) / np.timedelta64(1, "D") / 365.25, 0.01)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = values / principal
+        roi = np.where(principal > 0, (ratio - 1) * 100, 0.0)
+        cagr = np.where(principal > 0, (ratio ** (1 / years) - 1) * 100, 0.0)
+
+    summary = pd.DataFrame({
+        "value": values,
+        "roi": roi,
+        "cagr": cagr,
+        "assets": asset_counts,
+        "has_rebalanced": has_rebalanced,
+        "recently_rebalanced": recently,
+        "needs_rebalance": needs,
+        "status": status,
+        "drift_count": breach_counts,
+        "max_drift": max_drift,
+    }, index=pd.Index(book.names, name="profile"))
+    holdings = pd.DataFrame({
+        "profile": np.asarray(book.names, dtype=object)[profile_idx],
+        "ticker": book.symbols[book.symbol_idx],
+        "units": book.units,
+        "price": price_vec[book.symbol_idx],
+        "value": positions,
+        "weight": weights,
+        "target": book.targets,
+        "drift": drift,
+        "breach": breach,
+    })
+    return summary, holdings
+
+
+def drift_details(holdings):
+    """Return {profile: [(ticker, abs drift, actual %, target %)]} for every profile's breaching assets
+
+    One pass over the breaching rows of a scan_profiles holdings frame;
+    profiles without a breach are absent.
+    """
+    rows = holdings[holdings["breach"].to_numpy()]
+    details = {}
+    for p, t, d, w, tg in zip(rows["profile"], rows["ticker"], rows["drift"], rows["weight"], rows["target"]):
+        details.setdefault(p, []).append((t, float(abs(d)), float(w), float(tg)))
+    return details
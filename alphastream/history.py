@@ -0,0 +1,43 @@
+"""Aggregations over the executed-trades frame from TradeLedger.frame().
+
+One rebalance is one event_id; legacy trades recovered from text have
+units and side only, so value and drift measures skip them (NaN).
+"""
+import numpy as np
+import pandas as pd
+
+
+def turnover_by_year(trades):
+    """Traded dollar value per calendar year"""
+    if trades.empty:
+        return pd.Series(dtype=float, name="turnover")
+    return trades.groupby(trades["ts"].dt.year)["value"].sum(min_count=1).rename("turnover").rename_axis("year")
+
+
+def rebalance_frequency(trades):
+    """Rebalances (events) and individual trades per calendar year"""
+    if trades.empty:
+        return pd.DataFrame(columns=["rebalances", "trades"], dtype=int)
+    by_year = trades.groupby(trades["ts"].dt.year)
+    return pd.DataFrame({
+        "rebalances": by_year["event_id"].nunique(),
+        "trades": by_year.size(),
+    }).rename_axis("year")
+
+
+def drift_reduction(trades):
+    """Per rebalance: total absolute drift of the traded assets before and after, and the reduction"""
+    if trades.empty:
+        return pd.DataFrame(columns=["ts", "profile", "drift_before", "drift_after", "reduction"])
+    measured = trades.assign(
+        drift_before=np.abs(trades["drift_before"]),
+        drift_after=np.abs(trades["drift_after"]),
+    )
+    events = measured.groupby("event_id").agg(
+        ts=("ts", "first"),
+        profile=("profile", "first"),
+        drift_before=("drift_before", lambda s: s.sum(min_count=1)),
+        drift_after=("drift_after", lambda s: s.sum(min_count=1)),
+    )
+    events["reduction"] = events["drift_before"] - events["drift_after"]
+    return events.reset_index()
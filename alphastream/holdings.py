@@ -0,0 +1,86 @@
+"""Columnar in-memory holdings for every profile.
+
+Holdings are flattened CSR-style: profile i owns rows offsets[i]:offsets[i+1]
+of the per-holding arrays, and symbol_idx points into one global symbol table.
+Valuation, drift and aggregation over all profiles become NumPy reductions.
+"""
+import numpy as np
+import pandas as pd
+
+
+class Holdings:
+    """Global symbol table plus per-holding index, units and target arrays"""
+
+    def __init__(self, names, symbols, offsets, symbol_idx, units, targets, tolerance, principal,
+                 start, last_rebalanced, has_rebalanced):
+        self.names = names
+        self.symbols = symbols
+        self.offsets = offsets
+        self.symbol_idx = symbol_idx
+        self.units = units
+        self.targets = targets
+        self.tolerance = tolerance
+        self.principal = principal
+        self.start = start
+        self.last_rebalanced = last_rebalanced
+        self.has_rebalanced = has_rebalanced
+        self.profile_idx = np.repeat(np.arange(len(names)), np.diff(offsets))
+        self.position = {name: i for i, name in enumerate(names)}
+
+    @classmethod
+    def from_profiles(cls, profiles, today=None):
+        names = list(profiles)
+        counts, tickers, units, targets = [], [], [], []
+        for p in profiles.values():
+            assets = p.get("assets", {})
+            counts.append(len(assets))
+            for t, a in assets.items():
+                tickers.append(t)
+                units.append(a["units"])
+                targets.append(a["target"])
+        symbols, symbol_idx = np.unique(np.asarray(tickers, dtype=object), return_inverse=True)
+        default_start = (today or pd.Timestamp.today()).strftime("%Y-%m-%d")
+        return cls(
+            names=names,
+            symbols=symbols,
+            offsets=np.concatenate([[0], np.cumsum(counts, dtype=np.int64)]).astype(np.int64),
+            symbol_idx=symbol_idx.astype(np.int32),
+            units=np.asarray(units, dtype=float),
+            targets=np.asarray(targets, dtype=float),
+            tolerance=np.array([float(p.get("drift_tolerance", 5.0)) for p in profiles.values()]),
+            principal=np.array([float(p.get("principal", 0)) for p in profiles.values()]),
+            start=pd.to_datetime(
+                pd.Series([p.get("start_date") or default_start for p in profiles.values()], dtype=object),
+                format="%Y-%m-%d"
+            ).to_numpy(),
+            last_rebalanced=pd.to_datetime(
+                pd.Series([p.get("last_rebalanced") for p in profiles.values()], dtype=object),
+                format="%Y-%m-%d %H:%M:%S", errors="coerce"
+            ).to_numpy(),
+            has_rebalanced=np.array([p.get("last_rebalanced") is not None for p in profiles.values()], dtype=bool),
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def asset_counts(self):
+        return np.diff(self.offsets)
+
+    def price_vector(self, prices):
+        """Align a {ticker: price} dict to the symbol table; unpriced symbols are 0"""
+        return np.array([float(prices.get(s, 0)) for s in self.symbols])
+
+    def positions(self, price_vec):
+        """Market value of every holding"""
+        return self.units * price_vec[self.symbol_idx]
+
+    def profile_sum(self, per_holding):
+        """Sum a per-holding array within each profile"""
+        return np.bincount(self.profile_idx, weights=per_holding, minlength=len(self.names))
+
+    def profile_slice(self, name):
+        """(tickers, units, targets) for one profile"""
+        i = self.position[name]
+        rows = slice(self.offsets[i], self.offsets[i + 1])
+        return self.symbols[self.symbol_idx[rows]], self.units[rows], self.targets[rows]
@@ -0,0 +1,178 @@
+"""Columnar tax lots and tax-aware sell selection.
+
+A profile's lots are parallel arrays sorted by (ticker, date): ticker index,
+acquisition date, units and per-unit cost. Lots of one ticker are the slice
+offsets[i]:offsets[i+1], so choosing which lots a sell consumes is one
+lexsort and a grouped cumulative sum over every ticker at once, not a loop
+over lot objects.
+
+Lots flagged estimated have a guessed cost basis: holdings that existed
+before lots were tracked are backfilled once as an opening lot at the
+profile's inception and first close.
+"""
+import numpy as np
+import pandas as pd
+
+SELL_METHODS = {
+    "FIFO": "Oldest lots first",
+    "HIFO": "Highest cost lots first",
+    "MIN_GAIN": "Losses first, then the smallest tax-weighted gains",
+}
+LONG_TERM_DAYS = 365
+# Long-term gains count at this fraction of a short-term gain when ranking lots for MIN_GAIN
+LONG_TERM_WEIGHT = 0.5
+
+
+class LotBook:
+    """One profile's lots as sorted arrays with a per-ticker offset index"""
+
+    def __init__(self, tickers, dates, units, cost, estimated=None):
+        tickers = np.asarray(tickers, dtype=object)
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        estimated = np.zeros(len(tickers), dtype=bool) if estimated is None else np.asarray(estimated, dtype=bool)
+        order = np.lexsort((dates, tickers)) if len(tickers) else np.arange(0)
+        self.symbols, inverse = np.unique(tickers[order], return_inverse=True)
+        self.ticker_idx = inverse.astype(np.int64)
+        self.dates = dates[order]
+        self.units = np.asarray(units, dtype=float)[order]
+        self.cost = np.asarray(cost, dtype=float)[order]
+        self.estimated = estimated[order]
+        self.offsets = np.searchsorted(self.ticker_idx, np.arange(len(self.symbols) + 1))
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from (ticker, "YYYY-MM-DD", units, cost[, estimated]) tuples"""
+        if not rows:
+            return cls([], [], [], [])
+        rows = [tuple(r) + (False,) * (5 - len(r)) for r in rows]
+        tickers, dates, units, cost, estimated = zip(*rows)
+        return cls(tickers, dates, units, cost, [bool(e) for e in estimated])
+
+    def __len__(self):
+        return len(self.units)
+
+    @property
+    def tickers(self):
+        return self.symbols[self.ticker_idx]
+
+    def rows(self):
+        """(ticker, "YYYY-MM-DD", units, cost, estimated) tuples for every lot with units left"""
+        keep = self.units > 1e-12
+        return list(zip(
+            self.tickers[keep].tolist(),
+            np.datetime_as_string(self.dates[keep], unit="D").tolist(),
+            self.units[keep].tolist(),
+            self.cost[keep].tolist(),
+            self.estimated[keep].astype(int).tolist(),
+        ))
+
+    def held(self):
+        """Units per ticker summed over its lots"""
+        return dict(zip(self.symbols.tolist(), np.add.reduceat(self.units, self.offsets[:-1]).tolist())) if len(self) else {}
+
+    def frame(self):
+        return pd.DataFrame({
+            "ticker": self.tickers, "date": self.dates, "units": self.units, "cost": self.cost,
+            "estimated": self.estimated,
+        })
+
+    def add(self, tickers, dates, units, cost, estimated=False):
+        """New book with extra lots appended"""
+        tickers = np.asarray(tickers, dtype=object)
+        return LotBook(
+            np.concatenate([self.tickers, tickers]),
+            np.concatenate([self.dates, np.asarray(dates, dtype="datetime64[D]")]),
+            np.concatenate([self.units, np.asarray(units, dtype=float)]),
+            np.concatenate([self.cost, np.asarray(cost, dtype=float)]),
+            np.concatenate([self.estimated, np.broadcast_to(np.asarray(estimated, dtype=bool), tickers.shape)]),
+        )
+
+    def set_units(self, ticker, units, price, today=None):
+        """Book after a manual holding change: added units open a lot today at price, removed ones close FIFO"""
+        change = float(units) - self.held().get(ticker, 0.0)
+        today = np.datetime64(str(today or pd.Timestamp.today().date())[:10], "D")
+        if change > 1e-12:
+            return self.add([ticker], [today], [change], [price])
+        if change < -1e-12:
+            return self.sell({ticker: -change}, {ticker: price}, "FIFO", today)[0]
+        return self
+
+    def reconcile(self, units, opening_date, opening_cost):
+        """Book whose lots sum to the profile's units per ticker
+
+        Units with no lots behind them become one opening lot at opening_date
+        and opening_cost[ticker], flagged estimated; lots beyond what is held
+        are dropped oldest first. Use it once to backfill holdings that predate
+        lot tracking, since every later change writes its own lot.
+        """
+        held = self.held()
+        symbols = list(units)
+        gap = np.array([float(units[t]) - held.get(t, 0.0) for t in symbols])
+        book = self
+        if (gap < -1e-9).any():
+            book, _ = book.sell({t: -g for t, g in zip(symbols, gap) if g < -1e-9}, {}, "FIFO", opening_date)
+        short = gap > 1e-9
+        if short.any():
+            tickers = np.asarray(symbols, dtype=object)[short]
+            book = book.add(
+                tickers,
+                np.full(len(tickers), np.datetime64(str(opening_date)[:10], "D")),
+                gap[short],
+                [opening_cost.get(t, np.nan) for t in tickers],
+                estimated=True,
+            )
+        return book
+
+    def select(self, sell_units, prices, method="FIFO", today=None):
+        """Units taken from each lot to sell sell_units[ticker] under method
+
+        Lots are ranked within each ticker by the method's key, then a grouped
+        cumulative sum hands each sell to lots in that order. Returns an array
+        aligned with this book's lots.
+        """
+        if not len(self):
+            return np.zeros(0)
+        want = np.array([float(sell_units.get(t, 0.0)) for t in self.symbols])
+        key = self._sort_key(prices, method, today)
+        order = np.lexsort((key, self.ticker_idx))
+        units = self.units[order]
+        grp = self.ticker_idx[order]
+        cum = np.cumsum(units)
+        start = self.offsets[grp]
+        before = cum - units - (cum[start] - units[start])
+        taken = np.zeros(len(self))
+        taken[order] = np.clip(want[grp] - before, 0.0, units)
+        return taken
+
+    def sell(self, sell_units, prices, method="FIFO", today=None):
+        """Return (remaining book, per-lot sales frame) after selling sell_units"""
+        taken = self.select(sell_units, prices, method, today)
+        price = np.array([float(prices.get(t, np.nan)) for t in self.symbols])[self.ticker_idx] if len(self) else np.zeros(0)
+        sold = taken > 0
+        today = np.datetime64(str(today or pd.Timestamp.today().date())[:10], "D")
+        sales = pd.DataFrame({
+            "ticker": self.tickers[sold],
+            "date": self.dates[sold],
+            "units": taken[sold],
+            "cost": self.cost[sold],
+            "price": price[sold],
+            "gain": (price[sold] - self.cost[sold]) * taken[sold],
+            "long_term": (today - self.dates[sold]).astype(np.int64) > LONG_TERM_DAYS,
+            "estimated": self.estimated[sold],
+        })
+        left = self.units - taken
+        keep = left > 1e-12
+        return LotBook(self.tickers[keep], self.dates[keep], left[keep], self.cost[keep], self.estimated[keep]), sales
+
+    def _sort_key(self, prices, method, today):
+        if method == "FIFO":
+            return self.dates.astype(np.int64)
+        if method == "HIFO":
+            return -self.cost
+        if method == "MIN_GAIN":
+            price = np.array([float(prices.get(t, np.nan)) for t in self.symbols])[self.ticker_idx]
+            gain = np.nan_to_num(price - self.cost)
+            today = np.datetime64(str(today or pd.Timestamp.today().date())[:10], "D")
+            long_term = (today - self.dates).astype(np.int64) > LONG_TERM_DAYS
+            return np.where((gain > 0) & long_term, gain * LONG_TERM_WEIGHT, gain)
+        raise ValueError(f"Unknown sell method {method!r}; expected one of {', '.join(SELL_METHODS)}")
@@ -0,0 +1,87 @@
+"""Persistent ticker metadata cache with batched, concurrent miss resolution."""
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from alphastream.providers import get_provider
+from alphastream.store import store_path
+
+METADATA_FIELDS = ["name", "currency", "exchange", "asset_type"]
+
+
+def parse_info(symbol, info):
+    """Reduce a provider info dict to the cached metadata fields"""
+    info = info or {}
+    return {
+        "name": info.get("longName") or info.get("shortName") or symbol,
+        "currency": info.get("currency"),
+        "exchange": info.get("fullExchangeName") or info.get("exchange"),
+        "asset_type": info.get("quoteType"),
+    }
+
+
+class MetadataStore:
+    """Symbol metadata (name, currency, exchange, asset type) kept on disk with a long TTL"""
+
+    def __init__(self, path=None, provider=None, ttl=timedelta(days=30), max_workers=8):
+        self.provider = provider or get_provider()
+        self.path = path or store_path(self.provider)
+        self.ttl = ttl
+        self.max_workers = max_workers
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS metadata (
+                    symbol TEXT PRIMARY KEY,
+                    name TEXT, currency TEXT, exchange TEXT, asset_type TEXT,
+                    fetched_at TEXT NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def cached(self, symbols):
+        """Return {symbol: metadata} for fresh entries only"""
+        if not symbols:
+            return {}
+        cutoff = (datetime.now() - self.ttl).isoformat(timespec="seconds")
+        marks = ",".join("?" * len(symbols))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT symbol, {', '.join(METADATA_FIELDS)} FROM metadata "
+                f"WHERE symbol IN ({marks}) AND fetched_at >= ?",
+                [*symbols, cutoff]
+            ).fetchall()
+        return {r[0]: dict(zip(METADATA_FIELDS, r[1:])) for r in rows}
+
+    def _fetch(self, symbol):
+        try:
+            return symbol, self.provider.info(symbol)
+        except Exception:
+            return symbol, None
+
+    def resolve(self, symbols):
+        """Fetch metadata for symbols concurrently and persist the successful lookups"""
+        if not symbols:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(symbols))) as pool:
+            results = list(pool.map(self._fetch, symbols))
+        fetched = {sym: parse_info(sym, info) for sym, info in results if info}
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?)",
+                [(sym, *(m[f] for f in METADATA_FIELDS), now) for sym, m in fetched.items()]
+            )
+        return fetched
+
+    def lookup(self, symbols):
+        """Return metadata for every symbol, resolving all misses in one batch
+
+        Symbols whose lookup fails fall back to their ticker as the name and are
+        retried on the next call.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        found = self.cached(symbols)
+        found.update(self.resolve([s for s in symbols if s not in found]))
+        return {s: found.get(s, parse_info(s, None)) for s in symbols}
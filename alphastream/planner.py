@@ -0,0 +1,61 @@
+"""Per-render price request planning: one deduplicated batch fetch per page."""
+from alphastream.calendars import align
+
+
+class PricePlan:
+    """Collects every symbol a page needs, by role, so they are fetched in one call
+
+    Roles are free-form ("holding", "benchmark", "fx", ...); a symbol needed
+    under several roles is fetched once.
+    """
+
+    def __init__(self):
+        self.roles = {}
+
+    def add(self, role, symbols):
+        """Register symbols for a role; empty entries (e.g. no benchmark) are ignored"""
+        bucket = self.roles.setdefault(role, [])
+        for sym in symbols:
+            if sym and sym not in bucket:
+                bucket.append(sym)
+        return self
+
+    def symbols(self, role=None):
+        """Symbols for one role, or the deduplicated union in registration order"""
+        if role is not None:
+            return list(self.roles.get(role, []))
+        return list(dict.fromkeys(s for bucket in self.roles.values() for s in bucket))
+
+    def history(self, load, start):
+        """Fetch daily closes for every planned symbol with a single load(symbols, start) call"""
+        return PlanResult(self, load(self.symbols(), start))
+
+    def quotes(self, load):
+        """Fetch last prices for every planned symbol with a single load(symbols) call"""
+        return load(self.symbols())
+
+
+class PlanResult:
+    """Splits a batched close frame back into per-role frames"""
+
+    def __init__(self, plan, frame):
+        self.plan = plan
+        self.frame = frame
+
+    def closes(self, role, fill="ffill_only"):
+        """Closes for a role on its exchanges' union calendar, gaps filled per calendars.align"""
+        cols = [s for s in self.plan.symbols(role) if s in self.frame.columns]
+        closes = align(self.frame[cols], fill)
+        # Keep the store's data versions with the columns that survived
+        versions = self.frame.attrs.get("versions", {})
+        closes.attrs = {"versions": {s: versions[s] for s in cols if s in versions}} if versions else {}
+        return closes
+
+    def series(self, symbol):
+        """One symbol's close series, or None when it was not returned"""
+        if symbol not in self.frame.columns:
+            return None
+        series = self.frame[symbol].dropna()
+        versions = self.frame.attrs.get("versions", {})
+        series.attrs = {"versions": {symbol: versions[symbol]}} if symbol in versions else {}
+        return series if not series.empty else None
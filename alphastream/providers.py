@@ -0,0 +1,199 @@
+"""Market data providers behind every price and metadata lookup.
+
+The active provider is chosen by configuration so the app, benchmarks and
+load tests can run without network access:
+
+    ALPHASTREAM_PROVIDER     yfinance (default) | fixture | synthetic
+    ALPHASTREAM_FIXTURE_DIR  directory of <SYMBOL>.csv / <SYMBOL>.parquet files
+    ALPHASTREAM_SEED         seed for the synthetic random walk
+"""
+import json
+import os
+import re
+import zlib
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def period_start(period, today=None):
+    """Translate a yfinance-style period ('5d', '6mo', '2y', 'max') to a start date"""
+    today = today or date.today()
+    if period is None or period == "max":
+        return None
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not match:
+        raise ValueError(f"Unsupported period '{period}'")
+    n, unit = int(match.group(1)), match.group(2)
+    days = {"d": 1, "wk": 7, "mo": 31, "y": 366}[unit] * n
+    # Calendar days, widened so short periods still reach the last trading day
+    return today - timedelta(days=days + (3 if unit == "d" else 0))
+
+
+def split_download(raw, symbols):
+    """Split a yf.download frame into one OHLCV frame per symbol"""
+    frames = {}
+    if raw is None or raw.empty:
+        return frames
+    if isinstance(raw.columns, pd.MultiIndex):
+        level = 1 if set(symbols) & set(raw.columns.get_level_values(1)) else 0
+        available = set(raw.columns.get_level_values(level))
+        for sym in symbols:
+            if sym in available:
+                frame = raw.xs(sym, axis=1, level=level)
+                frames[sym] = frame.reindex(columns=FIELDS).dropna(subset=["Close"])
+    elif len(symbols) == 1:
+        frames[symbols[0]] = raw.reindex(columns=FIELDS).dropna(subset=["Close"])
+    return {sym: frame for sym, frame in frames.items() if not frame.empty}
+
+
+class MarketDataProvider(ABC):
+    """Interface for daily bars, latest quotes and ticker metadata"""
+
+    name = "base"
+    label = "Market data"
+
+    @abstractmethod
+    def history(self, symbols, start=None, period=None):
+        """Return {symbol: OHLCV frame} of daily bars from start (or over period)"""
+
+    def quotes(self, symbols):
+        """Return {symbol: last close} for symbols with recent data"""
+        frames = self.history(list(symbols), period="5d")
+        return {sym: float(frame["Close"].iloc[-1]) for sym, frame in frames.items()}
+
+    def info(self, symbol):
+        """Return the metadata dict for a symbol (yfinance .info keys)"""
+        return {"symbol": symbol, "longName": symbol}
+
+
+class YFinanceProvider(MarketDataProvider):
+    name = "yfinance"
+    label = "Market data by Yahoo Finance"
+
+    def history(self, symbols, start=None, period=None):
+        import yfinance as yf
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+        if start is None:
+            raw = yf.download(symbols, period=period or "max", auto_adjust=True, progress=False)
+        else:
+            raw = yf.download(symbols, start=str(start), auto_adjust=True, progress=False)
+        return split_download(raw, symbols)
+
+    def info(self, symbol):
+        import yfinance as yf
+        return yf.Ticker(symbol).info or {}
+
+
+class _FrameProvider(MarketDataProvider):
+    """Shared start/period slicing for providers that build whole frames locally
+
+    A period counts back from the frame's own last bar rather than today, so
+    recorded fixtures keep answering quotes and validation however old they are.
+    """
+
+    @abstractmethod
+    def _frame(self, symbol):
+        """Whole OHLCV frame for symbol, or None when there is no data"""
+
+    def history(self, symbols, start=None, period=None):
+        frames = {}
+        for sym in symbols:
+            frame = self._frame(sym)
+            if frame is None or frame.empty:
+                continue
+            first = start if start is not None else period_start(period, frame.index[-1].date())
+            if first is not None:
+                frame = frame[frame.index >= pd.Timestamp(first)]
+            if not frame.empty:
+                frames[sym] = frame
+        return frames
+
+
+class FixtureProvider(_FrameProvider):
+    """Reads recorded bars from <SYMBOL>.csv or <SYMBOL>.parquet files"""
+
+    name = "fixture"
+    label = "Market data from local fixtures"
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._cache = {}
+        self._info = None
+
+    def _frame(self, symbol):
+        if symbol not in self._cache:
+            frame = None
+            base = os.path.join(self.directory, symbol)
+            if os.path.exists(base + ".parquet"):
+                frame = pd.read_parquet(base + ".parquet")
+            elif os.path.exists(base + ".csv"):
+                frame = pd.read_csv(base + ".csv", index_col=0)
+            if frame is not None:
+                frame.index = pd.DatetimeIndex(pd.to_datetime(frame.index), name="Date")
+                frame = frame.reindex(columns=FIELDS).dropna(subset=["Close"]).sort_index()
+            self._cache[symbol] = frame
+        return self._cache[symbol]
+
+    def info(self, symbol):
+        if self._info is None:
+            path = os.path.join(self.directory, "info.json")
+            self._info = {}
+            if os.path.exists(path):
+                with open(path, "r") as f:
+                    self._info = json.load(f)
+        if symbol not in self._info and self._frame(symbol) is None:
+            return {}
+        return self._info.get(symbol, {"symbol": symbol, "longName": symbol})
+
+
+class SyntheticProvider(_FrameProvider):
+    """Deterministic geometric random walk per symbol, seeded by symbol name"""
+
+    name = "synthetic"
+    label = "Synthetic market data"
+
+    def __init__(self, seed=0, first_date="2000-01-03", drift=0.07, volatility=0.2):
+        self.seed = int(seed)
+        self.index = pd.bdate_range(first_date, date.today(), name="Date")
+        self.drift = drift
+        self.volatility = volatility
+        self._cache = {}
+
+    def _frame(self, symbol):
+        if symbol not in self._cache:
+            rng = np.random.default_rng([self.seed, zlib.crc32(symbol.encode())])
+            n = len(self.index)
+            mu = self.drift / 252
+            sigma = self.volatility / np.sqrt(252)
+            close = rng.uniform(20, 200) * np.exp(np.cumsum(rng.normal(mu - sigma ** 2 / 2, sigma, n)))
+            spread = np.abs(rng.normal(0, sigma / 2, n))
+            self._cache[symbol] = pd.DataFrame({
+                "Open": close * (1 + rng.normal(0, sigma / 4, n)),
+                "High": close * (1 + spread),
+                "Low": close * (1 - spread),
+                "Close": close,
+                "Volume": rng.integers(100_000, 5_000_000, n).astype(float),
+            }, index=self.index)
+        return self._cache[symbol]
+
+    def info(self, symbol):
+        return {"symbol": symbol, "longName": f"{symbol} (synthetic)", "currency": "USD", "exchange": "SYN", "quoteType": "EQUITY"}
+
+
+def get_provider(name=None):
+    """Build the provider selected by name or the ALPHASTREAM_PROVIDER setting"""
+    name = (name or os.environ.get("ALPHASTREAM_PROVIDER", "yfinance")).lower()
+    if name == "yfinance":
+        return YFinanceProvider()
+    if name == "fixture":
+        return FixtureProvider(os.environ.get("ALPHASTREAM_FIXTURE_DIR", "fixtures"))
+    if name == "synthetic":
+        return SyntheticProvider(seed=os.environ.get("ALPHASTREAM_SEED", 0))
+    raise ValueError(f"Unknown market data provider '{name}'")
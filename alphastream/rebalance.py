@@ -0,0 +1,147 @@
+"""Trade solvers for the Rebalance Analysis.
+
+Everything works on aligned per-asset arrays (current units, last prices,
+target weights) so the same solvers serve one profile in the app and many
+profiles in batch jobs.
+"""
+import numpy as np
+
+
+def round_lots(target_units, prices, lot_size=1.0):
+    """Whole-lot holdings closest to target_units within the same budget
+
+    The budget is the value of the targets themselves. Starts from the floor
+    of every target (always affordable) and then buys single lots from the
+    leftover cash while that lowers the squared error of
+    position values vs target values. Buying one lot at price p against a
+    remaining shortfall r lowers that error by p(2r - p), so each step takes
+    the affordable lot with the largest reduction: cash goes where it closes
+    the most drift and stays uninvested only when every further lot would
+    overshoot its target by more than it fills. Each asset gains at most one
+    lot over its floor, so the loop runs at most once per asset. Assets without a
+    usable price keep their unrounded target. Returns (units, leftover cash).
+    """
+    target_units = np.asarray(target_units, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    valid = np.isfinite(prices) & (prices > 0) & np.isfinite(target_units)
+    lots = np.floor(np.where(valid, target_units, 0.0) / lot_size + 1e-9)
+    lot_prices = np.where(valid, prices * lot_size, np.inf)
+    shortfall = np.where(valid, target_units * prices - lots * prices * lot_size, 0.0)
+    cash = float(shortfall.sum())
+    while True:
+        gain = np.where(lot_prices <= cash + 1e-9, lot_prices * (2 * shortfall - lot_prices), -np.inf)
+        best = int(np.argmax(gain)) if len(gain) else 0
+        if not len(gain) or gain[best] <= 0:
+            break
+        lots[best] += 1
+        shortfall[best] -= lot_prices[best]
+        cash -= lot_prices[best]
+    return np.where(valid, lots * lot_size, target_units), max(cash, 0.0)
+
+
+def _fill(amount, room, order):
+    """Spread amount over room in the given priority order, filling each slot before the next"""
+    taken = np.zeros_like(room)
+    room_sorted = room[order]
+    before = np.concatenate(([0.0], np.cumsum(room_sorted)[:-1]))
+    taken[order] = np.clip(amount - before, 0.0, room_sorted)
+    return taken
+
+
+def band_weights(weights, targets, tolerance, inner_band=None):
+    """Minimum-turnover target weights that bring every asset inside its band
+
+    Assets drifted past tolerance are pulled to the nearest edge of the inner
+    band (target +/- inner_band, the tolerance band itself by default); assets
+    already inside tolerance stay put. Clipping moves every breaching asset by
+    the least it can, but buys and sells must net to zero, so the imbalance is
+    absorbed first by assets that are already trading in that direction and
+    then by untouched assets with the most room, which keeps the trade count
+    down while the total volume stays at its minimum. Any remaining imbalance
+    means the bands are infeasible together, and it is spread across all
+    assets in proportion to their targets. All weights are in percent.
+    """
+    weights = np.nan_to_num(np.asarray(weights, dtype=float))
+    targets = np.asarray(targets, dtype=float)
+    inner = tolerance if inner_band is None else min(inner_band, tolerance)
+    breach = np.abs(weights - targets) >= tolerance
+    band = np.where(breach, inner, tolerance)
+    lo = np.maximum(targets - band, 0.0)
+    hi = targets + band
+    new = np.clip(weights, lo, hi)
+    excess = new.sum() - weights.sum()
+    if abs(excess) < 1e-12:
+        return new
+    room = new - lo if excess > 0 else hi - new
+    # Assets already trading first (only those moving the needed way have room), then untouched ones, most room first
+    untouched = np.abs(new - weights) < 1e-12
+    order = np.lexsort((-room, untouched))
+    taken = _fill(abs(excess), room, order)
+    new = new - np.sign(excess) * taken
+    leftover = abs(excess) - taken.sum()
+    if leftover > 1e-9 and targets.sum() > 0:
+        new = new - np.sign(excess) * leftover * targets / targets.sum()
+    return new
+
+
+def water_fill(gaps, amount, groups, n_groups):
+    """Split each group's amount over its gaps, largest gaps first
+
+    Within a group the allocation is max(gap - level, 0) for the level that
+    spends exactly the amount (or fills every gap when the amount is larger),
+    so the biggest gaps shrink first and end up level with each other.
+    gaps are per-item and non-negative, groups maps items to 0..n_groups-1.
+    """
+    order = np.lexsort((-gaps, groups))
+    g, grp = gaps[order], groups[order]
+    first = np.searchsorted(grp, np.arange(n_groups))
+    cum = np.cumsum(g)
+    start = first[grp]
+    cum_in_group = cum - (cum[start] - g[start])
+    rank = np.arange(len(g)) - start + 1
+    level = (cum_in_group - amount[grp]) / rank
+    # g > level holds for a prefix of each sorted group; its length picks the level
+    filled = np.bincount(grp, weights=g > level, minlength=n_groups).astype(np.int64)
+    group_level = np.full(n_groups, np.inf)
+    has = filled > 0
+    group_level[has] = level[first[has] + filled[has] - 1]
+    return np.maximum(gaps - np.maximum(group_level, 0.0)[groups], 0.0)
+
+
+def route_cash_flow(values, targets, flow, groups=None):
+    """Position values after investing a contribution or raising a withdrawal
+
+    A contribution (flow > 0) only buys: it goes to the most underweight
+    assets first, measured against targets on the new total, and whatever is
+    left once every asset reaches target is spread in target proportions. A
+    withdrawal (flow < 0) only sells, from the most overweight assets first,
+    then pro rata to what remains. values and targets (%) are per holding;
+    groups maps holdings to profiles with flow given per profile, so every
+    profile is routed in one pass. Without groups, values form one portfolio
+    and flow is a scalar.
+    """
+    values = np.nan_to_num(np.asarray(values, dtype=float))
+    targets = np.asarray(targets, dtype=float)
+    if groups is None:
+        groups = np.zeros(len(values), dtype=np.int64)
+    flow = np.atleast_1d(np.asarray(flow, dtype=float))
+    n = len(flow)
+    held = np.bincount(groups, weights=values, minlength=n)
+    # A withdrawal can at most liquidate the whole profile
+    flow = np.maximum(flow, -held)
+    target_values = targets / 100 * (held + flow)[groups]
+    inflow, outflow = np.maximum(flow, 0.0), np.maximum(-flow, 0.0)
+
+    buy = water_fill(np.maximum(target_values - values, 0.0), inflow, groups, n)
+    target_sum = np.bincount(groups, weights=targets, minlength=n)
+    spare = inflow - np.bincount(groups, weights=buy, minlength=n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        buy += np.where(target_sum[groups] > 0, spare[groups] * targets / target_sum[groups], 0.0)
+
+    sell = water_fill(np.maximum(values - target_values, 0.0), outflow, groups, n)
+    remaining = values - sell
+    remaining_sum = np.bincount(groups, weights=remaining, minlength=n)
+    short = outflow - np.bincount(groups, weights=sell, minlength=n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sell += np.where(remaining_sum[groups] > 0, np.minimum(short[groups] * remaining / remaining_sum[groups], remaining), 0.0)
+    return values + buy - sell
@@ -0,0 +1,102 @@
+"""Background price refresher that keeps the store and cache warm.
+
+Runs either as a daemon thread inside the Streamlit process (set
+ALPHASTREAM_REFRESH_INTERVAL) or standalone:
+
+    python -m alphastream.refresher --interval 300
+
+The in-memory cache is per process, so only the in-app thread pre-warms
+it; standalone runs keep just the on-disk price store current, which the
+app reads on its next cache miss.
+"""
+import argparse
+import logging
+import threading
+from datetime import timedelta
+
+from alphastream.db import DB_FILE, WealthDB
+from alphastream.planner import PricePlan
+from alphastream.providers import get_provider
+from alphastream.store import PriceStore, history_key
+
+log = logging.getLogger("alphastream.refresher")
+
+
+class PriceRefresher(threading.Thread):
+    """Periodically refreshes quotes and daily bars for every symbol held in the DB"""
+
+    def __init__(self, db, store, provider, cache=None, interval=300):
+        super().__init__(name="alphastream-refresher", daemon=True)
+        self.db = db
+        self.store = store
+        self.provider = provider
+        self.cache = cache
+        self.interval = interval
+        self._halt = threading.Event()
+
+    def plans(self, profiles):
+        """Return [(profile PricePlan, start_date)] mirroring the Portfolio Manager's fetch"""
+        return [
+            (PricePlan().add("holding", p.get("assets", {})).add("benchmark", [p.get("benchmark")]), p["start_date"])
+            for p in profiles.values() if p.get("assets")
+        ]
+
+    def refresh_once(self):
+        """Sync the store for every profile's symbols and pre-warm the shared cache"""
+        profiles, _ = self.db.load()
+        plans = self.plans(profiles["profiles"])
+        earliest = {}
+        for plan, start in plans:
+            for sym in plan.symbols():
+                earliest[sym] = min(earliest.get(sym, start), start)
+        by_start = {}
+        for sym, start in earliest.items():
+            by_start.setdefault(start, []).append(sym)
+        for start, symbols in sorted(by_start.items()):
+            self.store.sync(symbols, start, max_age=timedelta(0))
+
+        if self.cache is not None:
+            quotes = self.provider.quotes(sorted(earliest)) if earliest else {}
+            for sym, price in quotes.items():
+                self.cache.put("quote", sym, price)
+            for plan, start in plans:
+                symbols = plan.symbols()
+                self.cache.put("history", history_key(symbols, start), self.store.read(symbols, start=start))
+        log.info("Refreshed %d symbols across %d profiles", len(earliest), len(plans))
+        return len(earliest)
+
+    def run(self):
+        while not self._halt.is_set():
+            try:
+                self.refresh_once()
+            except Exception:
+                log.exception("Price refresh failed")
+            self._halt.wait(self.interval)
+
+    def stop(self):
+        self._halt.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="alphastream-refresher", description=__doc__.splitlines()[0])
+    parser.add_argument("--interval", type=float, default=300, help="seconds between refreshes")
+    parser.add_argument("--db", default=DB_FILE, help="profile database path")
+    parser.add_argument("--once", action="store_true", help="refresh once and exit")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    provider = get_provider()
+    # No cache: it would live only in this process and never reach the app
+    refresher = PriceRefresher(WealthDB(args.db), PriceStore(provider=provider), provider, None, args.interval)
+    if args.once:
+        refresher.refresh_once()
+        return
+    refresher.start()
+    try:
+        refresher.join()
+    except KeyboardInterrupt:
+        refresher.stop()
+
+
+if __name__ == "__main__":
+    main()
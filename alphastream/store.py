@@ -0,0 +1,208 @@
+"""Local on-disk OHLCV store behind the price history downloads."""
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from alphastream.providers import FIELDS, get_provider
+
+log = logging.getLogger("alphastream.store")
+
+STORE_FILE = "alphastream_prices.db"
+# Relative change in a settled close that means the provider re-based the series (split/dividend adjustment)
+REBASE_TOLERANCE = 1e-4
+
+
+def history_key(symbols, start):
+    """Cache key for a store history read, shared by page renders and the refresher"""
+    return ("store", tuple(symbols), str(start))
+
+
+def store_path(provider):
+    """Keep bars from offline providers out of the live yfinance store"""
+    if provider.name == "yfinance":
+        return STORE_FILE
+    return STORE_FILE.replace(".db", f"_{provider.name}.db")
+
+
+class PriceStore:
+    """SQLite-backed daily bar store that only fetches the missing tail"""
+
+    def __init__(self, path=None, provider=None, stale_after=timedelta(minutes=15)):
+        self.provider = provider or get_provider()
+        self.path = path or store_path(self.provider)
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bars (
+                    symbol TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL, volume REAL,
+                    PRIMARY KEY (symbol, date)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS coverage (
+                    symbol TEXT PRIMARY KEY,
+                    first_date TEXT NOT NULL,
+                    last_date TEXT NOT NULL,
+                    fetched_at TEXT NOT NULL,
+                    based_at TEXT
+                )
+            """)
+            # based_at changes only when a symbol's history is replaced; older stores get the column as NULL
+            if "based_at" not in [r[1] for r in conn.execute("PRAGMA table_info(coverage)")]:
+                conn.execute("ALTER TABLE coverage ADD COLUMN based_at TEXT")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def coverage(self, symbols):
+        """Return {symbol: (first_date, last_date, fetched_at)} for stored symbols"""
+        if not symbols:
+            return {}
+        marks = ",".join("?" * len(symbols))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT symbol, first_date, last_date, fetched_at FROM coverage WHERE symbol IN ({marks})",
+                list(symbols)
+            ).fetchall()
+        return {r[0]: (r[1], r[2], datetime.fromisoformat(r[3])) for r in rows}
+
+    def write(self, symbol, frame, first_date=None):
+        """Upsert OHLCV bars for a symbol and extend its coverage"""
+        frame = frame.reindex(columns=FIELDS)
+        dates = [d.strftime("%Y-%m-%d") for d in pd.DatetimeIndex(frame.index)]
+        rows = [
+            (symbol, d, *(None if pd.isna(v) else float(v) for v in vals))
+            for d, vals in zip(dates, frame.itertuples(index=False, name=None))
+        ]
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            prev = conn.execute(
+                "SELECT first_date, last_date, based_at FROM coverage WHERE symbol = ?", (symbol,)
+            ).fetchone()
+            firsts = [d for d in (first_date, prev and prev[0], dates[0] if dates else None) if d]
+            lasts = [d for d in (prev and prev[1], dates[-1] if dates else None) if d]
+            if firsts and lasts:
+                conn.execute(
+                    "INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?, ?)",
+                    (symbol, min(firsts), max(lasts), now, prev[2] if prev else datetime.now().isoformat())
+                )
+
+    def settled_close(self, symbol, last_date):
+        """(date, close) of the last stored bar before last_date, a finished session that should not change"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT date, close FROM bars WHERE symbol = ? AND date < ? ORDER BY date DESC LIMIT 1",
+                (symbol, last_date)
+            ).fetchone()
+
+    def replace(self, symbol, frame, first_date):
+        """Drop every stored bar for symbol and store frame as its whole history"""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM bars WHERE symbol = ?", (symbol,))
+            conn.execute("DELETE FROM coverage WHERE symbol = ?", (symbol,))
+        self.write(symbol, frame, first_date=first_date)
+
+    def read(self, symbols, start=None, field="Close"):
+        """Read one field for symbols as a date x symbol frame
+
+        The frame's attrs["versions"] holds the symbols' based_at stamps,
+        read in the same transaction as the bars, so caches downstream can
+        tell a re-based history from one that only grew a tail.
+        """
+        column = field.lower()
+        if column not in {f.lower() for f in FIELDS}:
+            raise ValueError(f"Unknown field '{field}'")
+        if not symbols:
+            return pd.DataFrame()
+        marks = ",".join("?" * len(symbols))
+        query = f"SELECT date, symbol, {column} FROM bars WHERE symbol IN ({marks})"
+        params = list(symbols)
+        if start:
+            query += " AND date >= ?"
+            params.append(str(start))
+        with self._connect() as conn:
+            conn.execute("BEGIN")
+            rows = conn.execute(query + " ORDER BY date", params).fetchall()
+            versions = dict(conn.execute(
+                f"SELECT symbol, based_at FROM coverage WHERE symbol IN ({marks})", list(symbols)
+            ).fetchall())
+        if not rows:
+            return pd.DataFrame()
+        long = pd.DataFrame(rows, columns=["Date", "symbol", field])
+        frame = long.pivot(index="Date", columns="symbol", values=field)
+        frame.index = pd.DatetimeIndex(frame.index, name="Date")
+        frame.columns.name = None
+        frame = frame[[s for s in symbols if s in frame.columns]]
+        frame.attrs["versions"] = {s: versions.get(s) for s in frame.columns}
+        return frame
+
+    def sync(self, symbols, start, max_age=None):
+        """Fetch missing history for symbols, grouping requests by start date
+
+        Stored symbols are only topped up once their last fetch is older than
+        max_age (default: the store's stale_after).
+
+        Adjusted closes are re-based by the provider after a split or
+        dividend. A top-up starts one settled bar before the last stored one,
+        and when that bar no longer matches what is stored the symbol's whole
+        history is refetched and replaced instead of being spliced.
+        """
+        start = str(start)
+        max_age = self.stale_after if max_age is None else max_age
+        coverage = self.coverage(symbols)
+        now = datetime.now()
+        plan, checks = {}, {}
+        for sym in symbols:
+            cov = coverage.get(sym)
+            if cov is None or cov[0] > start:
+                plan.setdefault(start, []).append(sym)
+            elif now - cov[2] >= max_age:
+                # Refetch the last stored bar too, it may have been an intraday snapshot
+                settled = self.settled_close(sym, cov[1])
+                if settled is not None:
+                    checks[sym] = settled
+                plan.setdefault(settled[0] if settled else cov[1], []).append(sym)
+        for fetch_start, group in plan.items():
+            try:
+                frames = self.provider.history(group, start=fetch_start)
+            except Exception:
+                # Keep serving the stored bars, but leave a trace of an outage
+                log.exception("History fetch for %s from %s failed", ", ".join(group), fetch_start)
+                continue
+            for sym, frame in frames.items():
+                if sym in checks and self._rebased(frame, *checks[sym]):
+                    first = coverage[sym][0]
+                    try:
+                        full = self.provider.history([sym], start=first).get(sym)
+                    except Exception:
+                        log.exception("Refetching re-based history for %s from %s failed", sym, first)
+                        continue
+                    if full is not None and not full.empty:
+                        self.replace(sym, full, first)
+                    continue
+                self.write(sym, frame, first_date=start if fetch_start == start else None)
+
+    @staticmethod
+    def _rebased(frame, date, stored):
+        """Whether frame's close on date moved away from the stored close"""
+        if stored is None:
+            return False
+        fresh = frame["Close"][pd.DatetimeIndex(frame.index).strftime("%Y-%m-%d") == date]
+        if fresh.empty or pd.isna(fresh.iloc[0]):
+            return False
+        return abs(float(fresh.iloc[0]) / stored - 1) > REBASE_TOLERANCE
+
+    def history(self, symbols, start, field="Close"):
+        """Return stored history for symbols after syncing the missing tail"""
+        symbols = list(dict.fromkeys(symbols))
+        self.sync(symbols, start)
+        return self.read(symbols, start=start, field=field)
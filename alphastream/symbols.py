@@ -0,0 +1,57 @@
+"""Ticker validation and the local symbol directory used by the asset editor."""
+import bisect
+
+POPULAR_SYMBOLS = [
+    "AAPL", "MSFT", "GOOGL", "AMZN", "TSLA",
+    "SPY", "QQQ", "VTI", "VOO", "IWM", "DIA",
+    "AGG", "BND", "TLT",
+]
+
+
+def validate_ticker(symbol, provider, metadata, cache):
+    """Return {"valid", "price", "name"} for symbol, memoized under the validation TTL
+
+    Symbols without price data are cached as invalid too, so a bad symbol is
+    not re-queried on every rerun. Provider errors propagate uncached.
+    """
+    def fetch():
+        hist = provider.history([symbol], period="1d").get(symbol)
+        if hist is None or hist.empty:
+            return {"valid": False, "price": None, "name": symbol}
+        return {
+            "valid": True,
+            "price": float(hist["Close"].iloc[-1]),
+            "name": metadata.lookup([symbol])[symbol]["name"],
+        }
+    return cache.get_or_fetch("validation", symbol, fetch)
+
+
+class SymbolDirectory:
+    """Sorted local symbol list with names for instant prefix search"""
+
+    def __init__(self, names):
+        self.names = dict(names)
+        self.symbols = sorted(self.names)
+
+    @classmethod
+    def load(cls, metadata, extra=()):
+        """Build from popular symbols, extra (e.g. held) symbols and cached metadata"""
+        names = {s: s for s in POPULAR_SYMBOLS}
+        names.update({s: s for s in extra})
+        with metadata._connect() as conn:
+            names.update(conn.execute("SELECT symbol, name FROM metadata").fetchall())
+        return cls(names)
+
+    def label(self, symbol):
+        name = self.names.get(symbol)
+        return f"{symbol} — {name}" if name and name != symbol else symbol
+
+    def search(self, prefix, limit=10):
+        """Return up to limit symbols starting with prefix"""
+        prefix = prefix.upper()
+        i = bisect.bisect_left(self.symbols, prefix)
+        matches = []
+        while i < len(self.symbols) and self.symbols[i].startswith(prefix) and len(matches) < limit:
+            matches.append(self.symbols[i])
+            i += 1
+        return matches
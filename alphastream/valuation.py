@@ -0,0 +1,147 @@
+"""Vectorized portfolio valuation over an aligned price matrix."""
+import numpy as np
+import pandas as pd
+
+
+class PortfolioValuation:
+    """Values a portfolio as one prices x units product and keeps the aligned arrays
+
+    prices is a date x symbol frame of closes; assets is the profile's
+    {ticker: {"units", "target"}} dict. Only symbols present in both are valued.
+    A holding with no close yet (before it listed) is worth nothing that day
+    rather than making the whole portfolio value NaN.
+    """
+
+    def __init__(self, prices, assets, version=None):
+        self.version = version
+        self.assets = {t: {"units": a["units"], "target": a["target"]} for t, a in assets.items()}
+        self.symbols = [t for t in assets if t in prices.columns]
+        self.units = np.array([float(assets[t]["units"]) for t in self.symbols])
+        self.targets = np.array([float(assets[t]["target"]) for t in self.symbols])
+        self.index = prices.index
+        self._prices = prices[self.symbols].to_numpy(dtype=float)
+        self._positions = np.nan_to_num(self._prices * self.units)
+        self._values = self._positions.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self._weights = self._positions / self._values[:, None] * 100
+        # Rows of the buffers some valuation already exposes; only rows past this may be written
+        self._claimed = [len(self.index)]
+
+    # Arrays live in buffers that may have spare rows for extend(); expose the valid part
+    @property
+    def prices(self):
+        return self._prices[:len(self.index)]
+
+    @property
+    def values(self):
+        return self._values[:len(self.index)]
+
+    @property
+    def positions(self):
+        return self._positions[:len(self.index)]
+
+    @property
+    def weights(self):
+        return self._weights[:len(self.index)]
+
+    def extend(self, prices, version=None):
+        """Revalue only the bars from this valuation's last bar onward
+
+        prices must be the same data version as this valuation (the history
+        up to its last bar unchanged; the last bar itself may have been a
+        partial day and is recomputed); otherwise the whole frame is
+        revalued. New rows go into spare buffer capacity shared with this
+        valuation, which never sees them. When a row this valuation or an
+        earlier extension exposes would change, the extension copies the
+        buffers first, so a valuation never changes after it is returned.
+        """
+        n = len(self.index) - 1
+        if (
+            version != self.version
+            or len(prices.index) <= n
+            or prices.index[0] != self.index[0]
+            or prices.index[n] != self.index[-1]
+            or [t for t in self.assets if t in prices.columns] != self.symbols
+        ):
+            return PortfolioValuation(prices, self.assets, version)
+        tail = prices.iloc[n:][self.symbols].to_numpy(dtype=float)
+        size = len(prices.index)
+        # An unchanged last bar is kept as is and the new rows start after it
+        start = n + 1 if np.array_equal(tail[0], self._prices[n], equal_nan=True) else n
+        extended = object.__new__(PortfolioValuation)
+        extended.__dict__.update(self.__dict__)
+        extended.index = prices.index
+        if size > len(self._values) or start == n or self._claimed[0] != n + 1:
+            capacity = max(size, 2 * len(self._values)) if size > len(self._values) else len(self._values)
+            for name in ("_prices", "_values", "_positions", "_weights"):
+                old = getattr(self, name)
+                buf = np.empty((capacity,) + old.shape[1:])
+                buf[:start] = old[:start]
+                setattr(extended, name, buf)
+            extended._claimed = [size]
+        else:
+            self._claimed[0] = size
+        rows = slice(start, size)
+        tail = tail[start - n:]
+        extended._prices[rows] = tail
+        extended._positions[rows] = np.nan_to_num(tail * self.units)
+        extended._values[rows] = extended._positions[rows].sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            extended._weights[rows] = extended._positions[rows] / extended._values[rows, None] * 100
+        return extended
+
+    @property
+    def value_series(self):
+        return pd.Series(self.values, index=self.index, name="Portfolio")
+
+    @property
+    def current_value(self):
+        return float(self.values[-1])
+
+    @property
+    def last_prices(self):
+        return self.prices[-1]
+
+    @property
+    def prev_prices(self):
+        return self.prices[-2] if len(self.prices) > 1 else self.prices[-1]
+
+    @property
+    def current_weights(self):
+        return self.weights[-1]
+
+    @property
+    def drift(self):
+        """Signed drift in percentage points of each asset from its target"""
+        return self.current_weights - self.targets
+
+    def weight_frame(self):
+        """Per-asset weights (%) for every day"""
+        return pd.DataFrame(self.weights, index=self.index, columns=self.symbols)
+
+    def drift_assets(self, tolerance):
+        """Return [(ticker, abs drift, actual %, target %)] for assets at or past tolerance"""
+        abs_drift = np.abs(self.drift)
+        hits = np.flatnonzero(abs_drift >= tolerance)
+        return [
+            (self.symbols[i], float(abs_drift[i]), float(self.current_weights[i]), float(self.targets[i]))
+            for i in hits
+        ]
+
+    def rebalance_plan(self, targets=None):
+        """Target values/units and the trades needed to return every asset to target
+
+        targets overrides the profile's target weights (%), e.g. with band
+        edges from rebalance.band_weights.
+        """
+        curr_v = self.current_value
+        target_values = (self.targets if targets is None else targets) / 100 * curr_v
+        target_units = target_values / self.last_prices
+        value_diff = target_values - self.positions[-1]
+        return {
+            "target_values": target_values,
+            "target_units": target_units,
+            "value_diff": value_diff,
+            "unit_diff": target_units - self.units,
+            "turnover": float(np.abs(value_diff).sum()),
+        }
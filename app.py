@@ -1,12 +1,23 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
 from datetime import datetime, date, timedelta
-import json
 import os
 
+from alphastream import core, history
+from alphastream.cache import CachedProvider, get_cache
+from alphastream.charts import CHART_RANGES, MAX_POINTS, FigureCache, build_performance_figure, series_version
+from alphastream.calendars import calendar_available, exchange_for
+from alphastream.db import ConflictError, WealthDB
+from alphastream.holdings import Holdings
+from alphastream.metadata import MetadataStore
+from alphastream.metrics import MetricsCache, data_version, holdings_hash
+from alphastream.planner import PricePlan
+from alphastream.providers import get_provider
+from alphastream.refresher import PriceRefresher
+from alphastream.store import PriceStore, history_key
+from alphastream.symbols import POPULAR_SYMBOLS, SymbolDirectory, validate_ticker
+
 # ===== CONFIGURATION =====
 st.set_page_config(
     page_title="AlphaStream Wealth Master",
@@ -234,38 +245,107 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ===== PERSISTENCE LAYER =====
-DB_FILE = "alphastream_wealth.json"
+@st.cache_resource
+def get_wealth_db():
+    return WealthDB()
 
 def load_db():
-    base_schema = {"profiles": {}, "global_logs": []}
-    if os.path.exists(DB_FILE):
-        with open(DB_FILE, "r") as f:
-            try: 
-                data = json.load(f)
-                data.setdefault("profiles", {})
-                data.setdefault("global_logs", [])
-                for p in data["profiles"].values():
-                    p.setdefault("drift_tolerance", 5.0)
-                    p.setdefault("rebalance_stats", [])
-                    p.setdefault("last_rebalanced", None)
-                    p.setdefault("benchmark", None)
-                return data
-            except: 
-                return base_schema
-    return base_schema
+    data, st.session_state.db_snapshot = get_wealth_db().load()
+    return data
+
+def save_db(data, events=(), lots=None):
+    try:
+        st.session_state.db_snapshot = get_wealth_db().save(data, st.session_state.db_snapshot, events, lots)
+        return True
+    except ConflictError as e:
+        # Drop the conflicting edit and continue from what the other session saved
+        st.session_state.db = load_db()
+        st.session_state.db_conflict = f"{e}. Your change was not saved; the latest version has been loaded."
+        return False
+
+def refresh_db():
+    st.session_state.db_snapshot = get_wealth_db().refresh(st.session_state.db, st.session_state.db_snapshot)
+
+def get_holdings():
+    """Columnar holdings for all profiles, rebuilt only when the DB snapshot changes"""
+    if st.session_state.get("holdings_snapshot") is not st.session_state.db_snapshot:
+        st.session_state.holdings = Holdings.from_profiles(st.session_state.db["profiles"])
+        st.session_state.holdings_snapshot = st.session_state.db_snapshot
+    return st.session_state.holdings
+
+@st.cache_resource
+def get_market_data():
+    return CachedProvider(get_provider(), get_cache())
+
+@st.cache_resource
+def get_price_store():
+    return PriceStore(provider=get_market_data().provider)
+
+@st.cache_resource
+def get_metadata():
+    return MetadataStore(provider=get_market_data())
+
+@st.cache_resource
+def get_metrics_cache():
+    return MetricsCache()
+
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
+
+def load_history(symbols, start):
+    """Daily closes from the local price store, shared across sessions for the history TTL"""
+    key = history_key(symbols, start)
+    return get_cache().get_or_fetch("history", key, lambda: get_price_store().history(symbols, start=start))
 
-def save_db(data):
-    with open(DB_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+@st.cache_resource
+def start_price_refresher():
+    """Keep quotes and daily bars warm in the background when ALPHASTREAM_REFRESH_INTERVAL is set"""
+    interval = float(os.environ.get("ALPHASTREAM_REFRESH_INTERVAL", 0))
+    if interval <= 0:
+        return None
+    refresher = PriceRefresher(get_wealth_db(), get_price_store(), get_market_data().provider, get_cache(), interval=interval)
+    refresher.start()
+    return refresher
 
-def log_profile(prof, message):
-    prof.setdefault("rebalance_logs", [])
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-    prof["rebalance_logs"].insert(0, {
-        "date": timestamp, 
-        "event": str(message)
+def log_profile(name, message):
+    get_wealth_db().journal.append(name, "activity", message)
+
+def profile_lots(name, prof, prices, closes=None):
+    """get_wealth_db().lots.current for a profile, loading its history only if the one-time backfill needs it"""
+    def opening_cost():
+        frame = closes if closes is not None else PricePlan().add("holding", list(prof["assets"])).history(load_history, prof["start_date"]).closes("holding")
+        return frame.bfill().iloc[0].to_dict() if not frame.empty else {}
+    return get_wealth_db().lots.current(name, prof.get("assets", {}), prof["start_date"], prices, opening_cost)
+
+def drift_badge(drift, tolerance):
+    if abs(drift) >= tolerance:
+        return f"🔴 {drift:+.2f}%"
+    if abs(drift) > 0.5:
+        return f"🟡 {drift:+.2f}%"
+    return f"🟢 {drift:+.2f}%"
+
+def trade_table(trades, asset_meta, tolerance, total_value, turnover):
+    """Display rows for core.rebalance_trades output, plus a TOTAL row"""
+    table = pd.DataFrame({
+        "Asset Class": [asset_meta[t]["name"] for t in trades["ticker"]],
+        "Fund": trades["ticker"],
+        "Units": trades["units"].map("{:.0f}".format),
+        "Unit Value": trades["price"].map("${:.2f}".format),
+        "%Daily Change": trades["daily_change"].map("{:+.2f}%".format),
+        "Amount": trades["value"].map("${:,.0f}".format),
+        "Allocation": trades["weight"].map("{:.2f}%".format),
+        "Target": trades["target"].map("{:.2f}%".format),
+        "Drift": [drift_badge(d, tolerance) for d in trades["drift"]],
+        "Buy/Sell Amt": trades["trade_value"].abs().map("${:,.0f}".format),
+        "Buy/Sell Shares": trades["trade_units"].map("{:+.0f}".format),
     })
-    prof["rebalance_logs"] = prof["rebalance_logs"][:50]
+    total = {
+        "Asset Class": "**TOTAL**", "Fund": "", "Units": "", "Unit Value": "", "%Daily Change": "",
+        "Amount": f"**${total_value:,.0f}**", "Allocation": "**100.00%**", "Target": "**100.00%**",
+        "Drift": "—", "Buy/Sell Amt": f"**${turnover:,.0f}**", "Buy/Sell Shares": "—",
+    }
+    return pd.concat([table, pd.DataFrame([total])], ignore_index=True)
 
 def description_box(title, content):
     st.markdown(f'''
@@ -275,52 +355,12 @@ def description_box(title, content):
         </div>
     ''', unsafe_allow_html=True)
 
-def check_recently_rebalanced(last_rebalanced_str):
-    """Check if portfolio was rebalanced in last 24 hours"""
-    if not last_rebalanced_str:
-        return False
-    try:
-        last_rebal_time = datetime.strptime(last_rebalanced_str, "%Y-%m-%d %H:%M:%S")
-        hours_since = (datetime.now() - last_rebal_time).total_seconds() / 3600
-        return hours_since < 24
-    except:
-        return False
-
-def calculate_drift_status(p_data, prices):
-    """Calculate if portfolio needs rebalancing"""
-    p_assets = p_data.get("assets", {})
-    if not p_assets:
-        return False, []
-    
-    curr_v = float(sum(p_assets[t]["units"] * prices.get(t, 0) for t in p_assets))
-    if curr_v == 0:
-        return False, []
-    
-    has_rebalanced = p_data.get("last_rebalanced") is not None
-    recently_rebalanced = check_recently_rebalanced(p_data.get("last_rebalanced"))
-    
-    # Never rebalanced = needs rebalance
-    if not has_rebalanced:
-        return True, []
-    
-    # Recently rebalanced = don't check drift yet
-    if recently_rebalanced:
-        return False, []
-    
-    # Check actual drift
-    drift_details = []
-    for t in p_assets:
-        actual_pct = float((p_assets[t]["units"] * prices.get(t, 0) / curr_v * 100))
-        target_pct = float(p_assets[t]["target"])
-        drift = abs(actual_pct - target_pct)
-        if drift >= p_data.get("drift_tolerance", 5.0):
-            drift_details.append((t, drift, actual_pct, target_pct))
-    
-    return len(drift_details) > 0, drift_details
-
 # ===== SESSION STATE =====
+start_price_refresher()
 if "db" not in st.session_state:
     st.session_state.db = load_db()
+else:
+    refresh_db()
 if "current_page" not in st.session_state:
     st.session_state.current_page = "Global Dashboard"
 if "active_profile" not in st.session_state:
@@ -362,14 +402,12 @@ with st.sidebar:
                         "yearly_goal_pct": n_goal,
                         "start_date": str(n_start),
                         "assets": {},
-                        "rebalance_logs": [],
                         "drift_tolerance": 5.0,
-                        "rebalance_stats": [],
                         "last_rebalanced": None,
                         "benchmark": None
                     }
-                    save_db(st.session_state.db)
-                    log_profile(st.session_state.db["profiles"][n_name], "Profile created")
+                    if save_db(st.session_state.db):
+                        log_profile(n_name, "Profile created")
                     st.success(f"✅ Profile '{n_name}' created!")
                     st.rerun()
                 elif not n_name:
@@ -419,8 +457,8 @@ with st.sidebar:
         )
         if st.button("💾 Update Tolerance", use_container_width=True, key="update_tolerance"):
             prof['drift_tolerance'] = new_tolerance
-            save_db(st.session_state.db)
-            log_profile(prof, f"Updated drift tolerance to {new_tolerance}%")
+            if save_db(st.session_state.db):
+                log_profile(st.session_state.active_profile, f"Updated drift tolerance to {new_tolerance}%")
             st.success("✅ Updated!")
             st.rerun()
         
@@ -495,6 +533,21 @@ with st.sidebar:
         st.markdown(f"**{progress_color} Allocated: {current_alloc:.1f}% / 100%**")
         
         # Asset ticker input
+        def pick_symbol():
+            if st.session_state.symbol_pick:
+                st.session_state.ticker_input = st.session_state.symbol_pick
+        
+        symbol_directory = SymbolDirectory.load(get_metadata(), extra=prof.get("assets", {}).keys())
+        st.selectbox(
+            "Quick Pick",
+            options=symbol_directory.symbols,
+            index=None,
+            format_func=symbol_directory.label,
+            placeholder="Search saved and popular tickers",
+            on_change=pick_symbol,
+            key="symbol_pick"
+        )
+        
         a_sym = st.text_input(
             "Ticker Symbol",
             placeholder="e.g., AAPL, MSFT",
@@ -530,15 +583,10 @@ with st.sidebar:
         if a_sym and not block_new:
             try:
                 with st.spinner(f"🔍 Validating {a_sym}..."):
-                    t_check = yf.Ticker(a_sym)
-                    hist = t_check.history(period="1d")
-                    if not hist.empty:
-                        last_price = float(hist['Close'].iloc[-1])
-                        try:
-                            ticker_info = t_check.info
-                            ticker_name = ticker_info.get('longName', a_sym)
-                        except:
-                            ticker_name = a_sym
+                    check = validate_ticker(a_sym, get_market_data(), get_metadata(), get_cache())
+                    if check["valid"]:
+                        last_price = check["price"]
+                        ticker_name = check["name"]
                         st.success(f"✓ {ticker_name}")
                         st.caption(f"**Current Price:** {p_flag} ${last_price:,.2f}")
                         valid_ticker = True
@@ -547,7 +595,8 @@ with st.sidebar:
             except:
                 if a_sym:
                     st.error(f"❌ Cannot validate '{a_sym}'. Please verify it's a valid stock symbol.")
-                    st.caption("💡 Try: AAPL, MSFT, GOOGL, TSLA, SPY, QQQ")
+                    suggestions = symbol_directory.search(a_sym[:2], limit=6) or POPULAR_SYMBOLS[:6]
+                    st.caption(f"💡 Try: {', '.join(suggestions)}")
         
         # Asset form
         if valid_ticker:
@@ -568,8 +617,7 @@ with st.sidebar:
             
             # Buying Guide
             if a_w > 0:
-                target_value = (a_w / 100) * prof['principal']
-                suggested_units = target_value / last_price
+                target_value, suggested_units = core.buy_guide(a_w, prof['principal'], last_price)
                 
                 st.markdown(f"""
                     <div class="buying-guide">
@@ -594,19 +642,24 @@ with st.sidebar:
             with col_b1:
                 save_disabled = (a_w <= 0) or (a_w > max_available)
                 if st.button("💾 Save Asset", use_container_width=True, type="primary", key="save_asset", disabled=save_disabled):
+                    # Units added here were bought today, not at inception
+                    book = profile_lots(st.session_state.active_profile, prof, {a_sym: last_price}).set_units(a_sym, a_u, last_price)
                     prof.setdefault("assets", {})[a_sym] = {"units": a_u, "target": a_w}
                     action = "Updated" if is_existing else "Added"
-                    log_profile(prof, f"{action} {a_sym}: {a_w}% target, {a_u:.4f} units")
-                    save_db(st.session_state.db)
+                    save_db(st.session_state.db, [(st.session_state.active_profile, "activity", datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                                                   f"{action} {a_sym}: {a_w}% target, {a_u:.4f} units")],
+                            {st.session_state.active_profile: book})
                     st.success(f"✅ {action} {a_sym}!")
                     st.rerun()
             
             with col_b2:
                 if is_existing:
                     if st.button("🗑️ Remove", use_container_width=True, key="remove_asset"):
+                        book = profile_lots(st.session_state.active_profile, prof, {a_sym: last_price}).set_units(a_sym, 0.0, last_price)
                         del prof["assets"][a_sym]
-                        log_profile(prof, f"Removed {a_sym} from portfolio")
-                        save_db(st.session_state.db)
+                        save_db(st.session_state.db, [(st.session_state.active_profile, "activity", datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                                                       f"Removed {a_sym} from portfolio")],
+                                {st.session_state.active_profile: book})
                         st.success(f"✅ Removed {a_sym}!")
                         st.rerun()
         
@@ -622,17 +675,31 @@ with st.sidebar:
         st.markdown("### 📜 Activity Log")
         st.caption("Track all portfolio changes and updates")
         with st.expander("View Recent Activity", expanded=False):
-            all_logs = prof.get("rebalance_logs", [])
-            logs_to_show = all_logs[:20]
-            if logs_to_show:
-                for log_entry in logs_to_show:
-                    st.caption(f"**{log_entry['date']}**: {log_entry['event']}")
-                if len(all_logs) > 20:
-                    st.caption(f"... and {len(all_logs) - 20} more entries")
+            journal = get_wealth_db().journal
+            total_logs = journal.count(st.session_state.active_profile, "activity")
+            if total_logs:
+                pages = (total_logs - 1) // 20 + 1
+                log_page = 1
+                if pages > 1:
+                    log_page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key="activity_page")
+                for log_entry in journal.page(st.session_state.active_profile, "activity", limit=20, offset=(log_page - 1) * 20):
+                    st.caption(f"**{log_entry['date'][:16]}**: {log_entry['event']}")
+                st.caption(f"Page {log_page} of {pages} • {total_logs} entries")
             else:
                 st.caption("No activity yet")
 
 # ===== MAIN CONTENT =====
+if get_wealth_db().migration_error:
+    st.error(f"❌ {get_wealth_db().migration_error}. Your existing profiles are not shown; fix or restore the file and restart the app.")
+if st.session_state.get("db_conflict"):
+    st.warning(f"⚠️ {st.session_state.pop('db_conflict')}")
+# Success messages from a save are set just before st.rerun(), so they are shown on the next run
+if st.session_state.get("db_notice"):
+    notice, celebrate = st.session_state.pop("db_notice")
+    st.success(notice)
+    if celebrate:
+        st.balloons()
+
 if view_mode == "🏠 Global Dashboard":
     st.title("🏠 Global Portfolio Dashboard")
     
@@ -682,40 +749,22 @@ if view_mode == "🏠 Global Dashboard":
         
     else:
         # Fetch all prices
-        all_tickers = set()
-        for p in profiles.values():
-            all_tickers.update(p.get("assets", {}).keys())
+        holdings = get_holdings()
+        all_tickers = list(holdings.symbols)
         
         prices = {}
         if all_tickers:
             try:
                 with st.spinner("📊 Fetching market data..."):
-                    raw_px = yf.download(list(all_tickers), period="1d", progress=False)['Close']
-                    if len(all_tickers) == 1:
-                        if not raw_px.empty:
-                            prices = {list(all_tickers)[0]: float(raw_px.iloc[-1])}
-                    else:
-                        for k, v in raw_px.iloc[-1].to_dict().items():
-                            try:
-                                if pd.notna(v):
-                                    prices[k] = float(v)
-                            except:
-                                pass
+                    prices = PricePlan().add("holding", all_tickers).quotes(get_market_data().quotes)
             except:
                 st.warning("⚠️ Could not fetch current prices. Portfolio values may be outdated.")
         
         # Calculate summary metrics
-        total_value = 0
-        total_drift_count = 0
-        
-        for p_data in profiles.values():
-            p_assets = p_data.get("assets", {})
-            curr_v = float(sum(p_assets[t]["units"] * prices.get(t, 0) for t in p_assets))
-            total_value += curr_v
-            
-            needs_rebal, _ = calculate_drift_status(p_data, prices)
-            if needs_rebal:
-                total_drift_count += 1
+        scan, scan_holdings = core.scan_profiles(holdings, prices)
+        scan_details = core.drift_details(scan_holdings)
+        total_value = float(scan["value"].sum())
+        total_drift_count = int(scan["needs_rebalance"].sum())
         
         # Top Metrics
         col_m1, col_m2, col_m3 = st.columns(3)
@@ -748,42 +797,46 @@ if view_mode == "🏠 Global Dashboard":
         
         st.divider()
         
+        batch_method = "FIFO"
+        if total_drift_count > 0:
+            batch_method = st.selectbox("Sell Lots", list(core.SELL_METHODS), format_func=lambda m: f"{m} — {core.SELL_METHODS[m]}",
+                                        key="batch_sell_method", help="Which lots the sells in Rebalance All close")
+        if total_drift_count > 0 and st.button(f"⚡ Rebalance All ({total_drift_count})", type="primary", key="rebalance_all",
+                                               help="Trade every flagged profile back to target in one save"):
+            batch = core.batch_trades(scan, scan_holdings)
+            events, lots = [], {}
+            for name, trades in batch.groupby("profile", sort=False):
+                book = profile_lots(name, profiles[name], prices)
+                profile_events, book = core.rebalance_profile(name, profiles[name], trades, book, "target", batch_method)
+                if profile_events:
+                    events += profile_events
+                    lots[name] = book
+            if save_db(st.session_state.db, events, lots):
+                st.session_state.db_notice = (f"✅ Rebalanced {len(lots)} profile(s)", False)
+            st.rerun()
+        
         # Portfolio Grid
         st.markdown("### 📁 Portfolio Strategies")
         st.caption("Click any profile name to view detailed analytics and manage assets")
         
         cols = st.columns(2)
         for i, (name, p_data) in enumerate(profiles.items()):
-            p_assets = p_data.get("assets", {})
-            curr_v = float(sum(p_assets[t]["units"] * prices.get(t, 0) for t in p_assets))
-            
-            has_rebalanced = p_data.get("last_rebalanced") is not None
-            recently_rebalanced = check_recently_rebalanced(p_data.get("last_rebalanced"))
-            needs_rebal, drift_details = calculate_drift_status(p_data, prices)
-            
-            # Calculate ROI and CAGR
-            start_val = float(p_data.get('principal', 0))
-            roi_pct = ((curr_v / start_val) - 1) * 100 if start_val > 0 else 0
-            
-            start_date = datetime.strptime(p_data.get('start_date', str(date.today())), '%Y-%m-%d')
-            years_elapsed = max((date.today() - start_date.date()).days / 365.25, 0.01)
-            cagr = ((curr_v / start_val) ** (1 / years_elapsed) - 1) * 100 if start_val > 0 and years_elapsed > 0 else 0
+            row = scan.loc[name]
+            curr_v = float(row["value"])
+            roi_pct = float(row["roi"])
+            cagr = float(row["cagr"])
+            needs_rebal = bool(row["needs_rebalance"])
+            details = scan_details.get(name, [])
             
             p_flag = "🇺🇸" if p_data.get("currency") == "USD" else "🇨🇦"
             
             # Determine status
-            if not has_rebalanced and len(p_assets) > 0:
+            if row["status"] == "rebalance_required":
                 tile_class = "profile-tile-warning"
                 status_badge = '<span class="drift-badge">🚨 REBALANCE REQUIRED</span>'
-            elif not has_rebalanced:
+            elif row["status"] == "not_rebalanced":
                 tile_class = "profile-tile"
                 status_badge = '<span style="background: #94a3b8; color: white; padding: 6px 14px; border-radius: 20px; font-size: 0.75rem; font-weight: 600;">⚪ Not Rebalanced</span>'
-            elif recently_rebalanced:
-                tile_class = "profile-tile-optimized"
-                status_badge = '<span class="success-badge">✅ Balanced</span>'
-            elif needs_rebal:
-                tile_class = "profile-tile-warning"
-                status_badge = '<span class="drift-badge">🚨 REBALANCE REQUIRED</span>'
             else:
                 tile_class = "profile-tile-optimized"
                 status_badge = '<span class="success-badge">✅ Balanced</span>'
@@ -825,9 +878,9 @@ if view_mode == "🏠 Global Dashboard":
                     </div>
                 """, unsafe_allow_html=True)
                 
-                if needs_rebal and drift_details:
+                if needs_rebal and details:
                     with st.expander("⚠️ View Drift Details", expanded=False):
-                        for t, drift, actual, target in drift_details:
+                        for t, drift, actual, target in details:
                             st.caption(f"• {t}: {drift:.1f}% drift")
                 
                 st.markdown("<div style='margin-bottom: 16px;'></div>", unsafe_allow_html=True)
@@ -845,7 +898,7 @@ else:  # Portfolio Manager
     
     # Portfolio Summary at top
     has_rebalanced = prof.get("last_rebalanced") is not None
-    recently_rebalanced = check_recently_rebalanced(prof.get("last_rebalanced"))
+    recently_rebalanced = core.is_recently_rebalanced(prof.get("last_rebalanced"))
     
     col_sum1, col_sum2, col_sum3, col_sum4 = st.columns(4)
     with col_sum1:
@@ -853,7 +906,7 @@ else:  # Portfolio Manager
         st.metric("Total Assets", asset_count)
     with col_sum2:
         prof_start = datetime.strptime(prof.get('start_date', str(date.today())), '%Y-%m-%d')
-        age_years = max((date.today() - prof_start.date()).days / 365.25, 0.01)
+        age_years = core.years_between(prof_start.date(), date.today())
         st.metric("Portfolio Age", f"{age_years:.1f} years")
     with col_sum3:
         if prof.get("last_rebalanced"):
@@ -889,16 +942,15 @@ else:  # Portfolio Manager
     # Fetch data and analyze
     with st.spinner("📊 Analyzing portfolio..."):
         try:
-            raw = yf.download(tickers, start=prof["start_date"], auto_adjust=True, progress=False)
+            # One batched fetch for every symbol this page needs
+            price_plan = PricePlan().add("holding", tickers).add("benchmark", [prof.get("benchmark")])
+            page_prices = price_plan.history(load_history, prof["start_date"])
+            data = page_prices.closes("holding")
             
-            if raw.empty:
+            if data.empty:
                 st.error("❌ Could not fetch historical data. Please check your tickers and date range.")
                 st.stop()
             
-            data = raw['Close']
-            if len(tickers) == 1:
-                data = pd.DataFrame(data, columns=tickers)
-            
             v_t = [t for t in tickers if t in data.columns]
             
             if not v_t:
@@ -910,38 +962,25 @@ else:  # Portfolio Manager
                 st.warning(f"⚠️ Could not load data for: {', '.join(missing)}")
             
             # Calculate portfolio metrics
-            daily_val = data[v_t].apply(
-                lambda r: sum(r[t] * asset_dict[t]["units"] for t in v_t if t in r.index),
-                axis=1
-            )
-            
-            curr_v = float(daily_val.iloc[-1])
+            valuation = get_metrics_cache().valuation(data, asset_dict)
+            daily_val = valuation.value_series
             start_val = float(prof['principal'])
-            
-            years = max((data.index[-1] - data.index[0]).days / 365.25, 0.01)
-            target_val = start_val * (1 + (float(prof['yearly_goal_pct'])/100))**years
-            perc_diff = ((curr_v / target_val) - 1) * 100
-            roi_pct = ((curr_v / start_val) - 1) * 100
-            
-            # Calculate CAGR
             prof_start_date = datetime.strptime(prof.get('start_date', str(date.today())), '%Y-%m-%d')
-            prof_years = max((date.today() - prof_start_date.date()).days / 365.25, 0.01)
-            profile_cagr = ((curr_v / start_val) ** (1 / prof_years) - 1) * 100 if start_val > 0 else 0
+            metrics = core.portfolio_metrics(daily_val, start_val, float(prof['yearly_goal_pct']), prof_start_date.date())
+            
+            curr_v = metrics.current_value
+            perc_diff = metrics.vs_goal
+            roi_pct = metrics.roi
+            profile_cagr = metrics.cagr
             
             # Drift detection
-            recently_rebalanced = check_recently_rebalanced(prof.get("last_rebalanced"))
+            recently_rebalanced = core.is_recently_rebalanced(prof.get("last_rebalanced"))
             needs_rebalance = False
             drift_assets = []
             
             if not recently_rebalanced:
-                for t in v_t:
-                    actual_pct = float((asset_dict[t]["units"] * data[t].iloc[-1] / curr_v * 100))
-                    target_pct = float(asset_dict[t]["target"])
-                    drift = float(abs(actual_pct - target_pct))
-                    
-                    if drift >= prof.get("drift_tolerance", 5.0):
-                        needs_rebalance = True
-                        drift_assets.append((t, drift, actual_pct, target_pct))
+                drift_assets = valuation.drift_assets(prof.get("drift_tolerance", 5.0))
+                needs_rebalance = len(drift_assets) > 0
             
             # Drift alert banner
             if needs_rebalance:
@@ -1038,7 +1077,7 @@ else:  # Portfolio Manager
                 """, unsafe_allow_html=True)
             
             with col_s5:
-                annualized = ((curr_v / start_val) ** (1/years) - 1) * 100
+                annualized = metrics.annualized
                 st.markdown(f"""
                     <div class="stat-item">
                         <div class="stat-label">Annualized Return</div>
@@ -1055,64 +1094,32 @@ else:  # Portfolio Manager
             benchmark_caption = f" & 100% {prof.get('benchmark', '')}" if prof.get('benchmark') else ""
             st.caption(f"Track your portfolio's actual performance against your target growth trajectory{benchmark_caption}")
             
-            fig = go.Figure()
-            
-            # Actual portfolio
-            fig.add_trace(go.Scatter(
-                x=data.index,
-                y=daily_val,
-                name='Actual Portfolio',
-                line=dict(color='#3b82f6', width=3),
-                fill='tozeroy',
-                fillcolor='rgba(59, 130, 246, 0.1)',
-                hovertemplate='<b>Date:</b> %{x|%Y-%m-%d}<br>' +
-                             '<b>Portfolio Value:</b> $%{y:,.2f}<br>' +
-                             '<b>Performance:</b> Actual<br>' +
-                             '<extra></extra>'
-            ))
+            col_range, col_gl = st.columns([3, 1])
+            with col_range:
+                chart_range = st.radio("Chart Range", list(CHART_RANGES), index=len(CHART_RANGES) - 1, horizontal=True, key="chart_range")
+            with col_gl:
+                use_webgl = st.toggle("⚡ WebGL", value=len(data.index) > 2 * MAX_POINTS, help="Render with WebGL for long histories", key="chart_webgl")
             
             # Goal path
-            days = np.arange(len(data.index))
-            daily_rate = (float(prof['yearly_goal_pct']) / 100) / 365.25
-            target_path = start_val * (1 + daily_rate) ** days
-            
-            fig.add_trace(go.Scatter(
-                x=data.index,
-                y=target_path,
-                name=f'Goal Path ({prof["yearly_goal_pct"]}%/yr)',
-                line=dict(color='#10b981', width=2, dash='dash'),
-                hovertemplate='<b>Date:</b> %{x|%Y-%m-%d}<br>' +
-                             '<b>Target Value:</b> $%{y:,.2f}<br>' +
-                             f'<b>Goal Rate:</b> {prof["yearly_goal_pct"]}% annually<br>' +
-                             '<extra></extra>'
-            ))
+            target_path = pd.Series(core.goal_path(start_val, float(prof['yearly_goal_pct']), len(data.index)), index=data.index)
             
             # Benchmark comparison (100% invested in benchmark)
             benchmark_ticker = prof.get('benchmark')
             benchmark_comparison_msg = None
+            benchmark_normalized = None
+            benchmark_version = None
+            bench_return = None
             
             if benchmark_ticker:
                 try:
-                    benchmark_raw = yf.download(benchmark_ticker, start=prof["start_date"], auto_adjust=True, progress=False)
-                    if not benchmark_raw.empty:
-                        benchmark_data = benchmark_raw['Close']
+                    benchmark_data = page_prices.series(benchmark_ticker)
+                    if benchmark_data is not None:
                         
                         # Show what would happen if 100% was invested in benchmark
-                        benchmark_normalized = (benchmark_data / float(benchmark_data.iloc[0])) * start_val
-                        bench_return = ((float(benchmark_normalized.iloc[-1]) / start_val) - 1) * 100
+                        benchmark_normalized = core.normalize_benchmark(benchmark_data, start_val)
+                        benchmark_version = data_version(benchmark_data)
                         bench_final_value = float(benchmark_normalized.iloc[-1])
-                        
-                        fig.add_trace(go.Scatter(
-                            x=benchmark_data.index,
-                            y=benchmark_normalized,
-                            name=f'100% in {benchmark_ticker} ({bench_return:+.1f}%)',
-                            line=dict(color='#f59e0b', width=2, dash='dot'),
-                            hovertemplate='<b>Date:</b> %{x|%Y-%m-%d}<br>' +
-                                         '<b>Value if 100% in Benchmark:</b> $%{y:,.2f}<br>' +
-                                         f'<b>Benchmark:</b> {benchmark_ticker}<br>' +
-                                         f'<b>Total Return:</b> {bench_return:+.1f}%<br>' +
-                                         '<extra></extra>'
-                        ))
+                        bench_return = core.roi_pct(bench_final_value, start_val)
                         
                         # Prepare comparison message
                         portfolio_vs_bench = curr_v - bench_final_value
@@ -1125,40 +1132,31 @@ else:  # Portfolio Manager
                 except Exception as e:
                     st.caption(f"⚠️ Could not load benchmark {benchmark_ticker}")
             
-            fig.update_layout(
-                hovermode='x unified',
-                plot_bgcolor='white',
-                height=550,
-                hoverlabel=dict(
-                    bgcolor="white",
-                    font_size=14,
-                    font_family="Inter, sans-serif",
-                    bordercolor="#e2e8f0"
-                ),
-                xaxis=dict(
-                    showgrid=True,
-                    gridcolor='#f1f5f9',
-                    title='Date',
-                    title_font=dict(size=14, color='#64748b')
-                ),
-                yaxis=dict(
-                    showgrid=True,
-                    gridcolor='#f1f5f9',
-                    title='Portfolio Value ($)',
-                    title_font=dict(size=14, color='#64748b')
-                ),
-                legend=dict(
-                    orientation="h",
-                    yanchor="bottom",
-                    y=1.02,
-                    xanchor="right",
-                    x=1,
-                    font=dict(size=12)
-                ),
-                margin=dict(l=60, r=40, t=40, b=60)
+            figure_key = (
+                holdings_hash(asset_dict),
+                series_version(daily_val, valuation.version),
+                benchmark_ticker,
+                series_version(benchmark_normalized, benchmark_version),
+                float(prof["yearly_goal_pct"]),
+                start_val,
+                chart_range,
+                use_webgl
             )
+            fig = get_figure_cache().figure(figure_key, lambda: build_performance_figure(
+                daily_val,
+                target_path,
+                prof["yearly_goal_pct"],
+                benchmark=benchmark_normalized,
+                benchmark_ticker=benchmark_ticker,
+                bench_return=bench_return,
+                chart_range=chart_range,
+                webgl=use_webgl
+            ))
             
             st.plotly_chart(fig, use_container_width=True)
+            if not calendar_available() and len({exchange_for(t) for t in v_t}) > 1:
+                st.caption("ℹ️ Holdings trade on different exchanges. Without the optional exchange_calendars package, "
+                           "closes are only carried forward over the dates the price store returned, not aligned to each exchange's sessions.")
             
             # Show benchmark comparison if available
             if benchmark_comparison_msg:
@@ -1174,95 +1172,79 @@ else:  # Portfolio Manager
             st.markdown("### ⚖️ Rebalance Analysis")
             st.caption("Review asset allocation drift and required trades to restore target percentages")
             
-            rows = []
-            total_turnover = 0
-            total_current_val = 0
-            
-            for t in v_t:
-                current_price = float(data[t].iloc[-1])
-                try:
-                    prev_price = float(data[t].iloc[-2])
-                    daily_change_pct = ((current_price / prev_price) - 1) * 100
-                except:
-                    daily_change_pct = 0.0
-                
-                ticker_name = t
-                try:
-                    ticker_obj = yf.Ticker(t)
-                    info = ticker_obj.info
-                    if info and 'longName' in info:
-                        ticker_name = info.get('longName', t)
-                except:
-                    pass
-                
-                cur_u = float(asset_dict[t]["units"])
-                tar_w = float(asset_dict[t]['target'])
-                
-                act_val = cur_u * current_price
-                act_w = (act_val / curr_v * 100)
-                drift = act_w - tar_w
-                
-                tar_val = (tar_w / 100) * curr_v
-                tar_u = tar_val / current_price
-                
-                val_diff = tar_val - act_val
-                unit_diff = tar_u - cur_u
-                
-                total_turnover += abs(val_diff)
-                total_current_val += act_val
-                
-                if abs(drift) < 0.1:
-                    action = "—"
-                else:
-                    action = "BUY" if drift < 0 else "SELL"
-                
-                drift_display = f"{drift:+.2f}%"
-                if abs(drift) >= prof.get("drift_tolerance", 5.0):
-                    drift_display = f"🔴 {drift:+.2f}%"
-                elif abs(drift) > 0.5:
-                    drift_display = f"🟡 {drift:+.2f}%"
+            tolerance = float(prof.get("drift_tolerance", 5.0))
+            col_mode, col_band, col_lots = st.columns([2, 1, 1])
+            with col_mode:
+                rebalance_mode = st.radio("Rebalance Mode", ["🎯 Back to target", "📏 Back inside band", "💵 Cash flow"], horizontal=True, key="rebalance_mode",
+                                          help="Band mode trades only assets past the drift tolerance, and only as far as the band edge. "
+                                               "Cash flow mode invests a contribution or raises a withdrawal without trading the other way.")
+            band_mode = rebalance_mode == "📏 Back inside band"
+            cash_mode = rebalance_mode == "💵 Cash flow"
+            cash_flow = 0.0
+            inner_band = tolerance
+            with col_band:
+                if cash_mode:
+                    cash_flow = st.number_input("Contribution / Withdrawal ($)", value=0.0, step=500.0, key="cash_flow",
+                                                help="Positive adds new money (buys only), negative takes money out (sells only)")
                 else:
-                    drift_display = f"🟢 {drift:+.2f}%"
-                
-                daily_change_display = f"{daily_change_pct:+.2f}%"
-                
-                rows.append({
-                    "Asset Class": ticker_name,
-                    "Fund": t,
-                    "Units": f"{cur_u:.0f}",
-                    "Unit Value": f"${current_price:.2f}",
-                    "%Daily Change": daily_change_display,
-                    "Amount": f"${act_val:,.0f}",
-                    "Allocation": f"{act_w:.2f}%",
-                    "Target": f"{tar_w:.2f}%",
-                    "Drift": drift_display,
-                    "Buy/Sell Amt": f"${abs(val_diff):,.0f}",
-                    "Buy/Sell Shares": f"{unit_diff:+.0f}"
-                })
-            
-            # Total row
-            rows.append({
-                "Asset Class": "**TOTAL**",
-                "Fund": "",
-                "Units": "",
-                "Unit Value": "",
-                "%Daily Change": "",
-                "Amount": f"**${total_current_val:,.0f}**",
-                "Allocation": "**100.00%**",
-                "Target": "**100.00%**",
-                "Drift": "—",
-                "Buy/Sell Amt": f"**${total_turnover:,.0f}**",
-                "Buy/Sell Shares": "—"
-            })
+                    inner_band = st.number_input("Inner Band (%)", min_value=0.0, max_value=tolerance, value=tolerance, step=0.5,
+                                                 disabled=not band_mode, key="inner_band", help="How far from target breached assets are brought back")
+            with col_lots:
+                whole_shares = st.toggle("🔢 Whole shares", value=False, key="whole_shares", help="Round target units to whole shares; the remainder stays as cash")
+            trades = core.rebalance_trades(
+                valuation,
+                lot_size=1.0 if whole_shares else None,
+                tolerance=tolerance if band_mode else None,
+                inner_band=inner_band if band_mode else None,
+                cash_flow=cash_flow if cash_mode else None
+            )
+            trade_count = int((trades["trade_units"].abs() > 0.0001).sum())
+            total_turnover = float(trades["trade_value"].abs().sum())
+            leftover_cash = curr_v + cash_flow - float((trades["target_units"] * trades["price"]).sum())
+            can_execute = cash_flow != 0 if cash_mode else needs_rebalance
+            asset_meta = get_metadata().lookup(valuation.symbols)
             
-            df_rebalance = pd.DataFrame(rows)
+            df_rebalance = trade_table(trades, asset_meta, tolerance, curr_v, total_turnover)
             st.dataframe(df_rebalance, use_container_width=True, hide_index=True)
             
-            col_metric1, col_metric2 = st.columns(2)
+            col_metric1, col_metric2, col_metric3 = st.columns(3)
             with col_metric1:
                 st.metric("CAGR", f"{profile_cagr:.2f}%", help="Compound Annual Growth Rate")
             with col_metric2:
                 st.metric("Total Trade Volume", f"${total_turnover:,.0f}", help="Total dollar amount needed to rebalance")
+            with col_metric3:
+                st.metric("Trades", trade_count, help="Number of assets that need a buy or sell")
+            if whole_shares:
+                st.caption(f"💵 Uninvested after whole-share rounding: ${leftover_cash:,.2f}")
+            
+            # Tax lots behind the SELL rows
+            lot_book = profile_lots(st.session_state.active_profile, prof, dict(zip(trades["ticker"], trades["price"])), data)
+            sell_method = st.selectbox("Sell Lots", list(core.SELL_METHODS), format_func=lambda m: f"{m} — {core.SELL_METHODS[m]}", key="sell_method")
+            _, lot_sales = core.sell_lots(lot_book, trades, sell_method)
+            if not lot_sales.empty:
+                long_gain = float(lot_sales.loc[lot_sales["long_term"], "gain"].sum())
+                short_gain = float(lot_sales.loc[~lot_sales["long_term"], "gain"].sum())
+                est = " (est.)" if lot_sales["estimated"].any() else ""
+                col_gain1, col_gain2, col_gain3 = st.columns(3)
+                with col_gain1:
+                    st.metric(f"Realized Gain{est}", f"${long_gain + short_gain:,.0f}", help="Gain on the lots these sells would close")
+                with col_gain2:
+                    st.metric(f"Short-Term{est}", f"${short_gain:,.0f}")
+                with col_gain3:
+                    st.metric(f"Long-Term{est}", f"${long_gain:,.0f}", help="Lots held over a year")
+                if est:
+                    st.caption("⚠️ Some lots sold have an estimated cost basis: holdings entered before lots were tracked are costed at the first close on or after inception.")
+                with st.expander(f"🧾 {len(lot_sales)} Lot(s) Sold"):
+                    st.dataframe(pd.DataFrame({
+                        "Fund": lot_sales["ticker"],
+                        "Acquired": lot_sales["date"].dt.strftime("%Y-%m-%d"),
+                        "Units": lot_sales["units"].map("{:,.4f}".format),
+                        "Cost": lot_sales["cost"].map("${:,.2f}".format),
+                        "Price": lot_sales["price"].map("${:,.2f}".format),
+                        "Gain": lot_sales["gain"].map("${:+,.2f}".format),
+                        "Term": np.where(lot_sales["long_term"], "Long", "Short"),
+                        "Basis": np.where(lot_sales["estimated"], "Estimated", "Recorded"),
+                    }), use_container_width=True, hide_index=True)
             
             st.divider()
             
@@ -1276,33 +1258,16 @@ else:  # Portfolio Manager
                 if needs_rebalance:
                     st.warning("⚠️ **Rebalancing recommended**")
                 
-                if st.button("⚡ Execute Rebalancing", type="primary", use_container_width=True, disabled=not needs_rebalance):
-                    detail_log = f"{datetime.now().strftime('%Y-%m-%d %H:%M')} - "
-                    changes = []
-                    
-                    for t in v_t:
-                        old_units = float(asset_dict[t]["units"])
-                        new_units = float((asset_dict[t]["target"] / 100 * curr_v) / data[t].iloc[-1])
-                        asset_dict[t]["units"] = new_units
-                        
-                        change_val = new_units - old_units
-                        if abs(change_val) > 0.0001:
-                            action_color = "🟢" if change_val > 0 else "🔴"
-                            action_text = "BUY" if change_val > 0 else "SELL"
-                            changes.append(f"{action_color} {t} {action_text} {abs(change_val):.4f}")
-                    
-                    detail_log += ", ".join(changes) if changes else "No changes needed"
-                    
-                    prof.setdefault("rebalance_stats", []).insert(0, detail_log)
-                    prof["rebalance_stats"] = prof["rebalance_stats"][:50]
-                    prof["last_rebalanced"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    
-                    log_profile(prof, "Portfolio rebalanced to target allocations - Status: Balanced")
-                    save_db(st.session_state.db)
-                    
-                    st.success("✅ Portfolio rebalanced successfully! Status: **Balanced** ✅")
-                    st.balloons()
-                    st.rerun()
+                if st.button("⚡ Execute Rebalancing", type="primary", use_container_width=True, disabled=not can_execute):
+                    mode = "cash_flow" if cash_mode else "band" if band_mode else "target"
+                    events, lots_after = core.rebalance_profile(st.session_state.active_profile, prof, trades, lot_book, mode, sell_method,
+                                                                cash_flow if cash_mode else None)
+                    if not events:
+                        st.info("No trade is large enough to execute")
+                    else:
+                        if save_db(st.session_state.db, events, {st.session_state.active_profile: lots_after}):
+                            st.session_state.db_notice = ("✅ Portfolio rebalanced successfully! Status: **Balanced** ✅", True)
+                        st.rerun()
                 
                 if not needs_rebalance:
                     st.info("✓ Portfolio is optimally balanced")
@@ -1311,16 +1276,17 @@ else:  # Portfolio Manager
                 st.markdown("### 📊 Rebalance History Details")
                 st.caption("Detailed log of past rebalancing events")
                 
-                total_events = len(prof.get('rebalance_stats', []))
+                journal = get_wealth_db().journal
+                total_events = journal.count(st.session_state.active_profile, "rebalance")
                 if total_events > 0:
                     st.caption(f"Total events: {total_events}")
-                    for entry in prof.get("rebalance_stats", [])[:10]:
-                        st.caption(entry)
+                    for entry in journal.page(st.session_state.active_profile, "rebalance", limit=10):
+                        st.caption(f"{entry['date'][:16]} - {entry['event']}")
                     
                     if total_events > 10:
                         with st.expander(f"📜 Show {total_events - 10} More Events"):
-                            for entry in prof.get("rebalance_stats", [])[10:30]:
-                                st.caption(entry)
+                            for entry in journal.page(st.session_state.active_profile, "rebalance", limit=20, offset=10):
+                                st.caption(f"{entry['date'][:16]} - {entry['event']}")
                 else:
                     st.info("No rebalancing history yet")
                 
@@ -1330,6 +1296,30 @@ else:  # Portfolio Manager
                 st.caption("• Regular rebalancing maintains target allocation")
                 st.caption("• Drift tolerance controls when alerts trigger")
                 st.caption("• Check Activity Log in sidebar for history")
+            
+            # Rebalance Analytics
+            st.divider()
+            st.markdown("### 📈 Rebalance Analytics")
+            history_scope = st.radio("Scope", ["This profile", "All profiles"], horizontal=True, key="history_scope")
+            trade_history = get_wealth_db().trades.frame(st.session_state.active_profile if history_scope == "This profile" else None)
+            if trade_history.empty:
+                st.info("No executed trades recorded yet")
+            else:
+                col_h1, col_h2, col_h3 = st.columns(3)
+                with col_h1:
+                    st.markdown("**Turnover per Year ($)**")
+                    st.bar_chart(history.turnover_by_year(trade_history).rename(index=str))
+                with col_h2:
+                    st.markdown("**Rebalances per Year**")
+                    st.bar_chart(history.rebalance_frequency(trade_history).rename(index=str))
+                with col_h3:
+                    reduction = history.drift_reduction(trade_history).dropna(subset=["reduction"])
+                    st.markdown("**Drift Before / After Each Rebalance (pts)**")
+                    if reduction.empty:
+                        st.caption("Only legacy text records; no drift measurements yet")
+                    else:
+                        # Two lines rather than grouped bars: bar_chart's stack= needs a newer Streamlit than requirements.txt pins
+                        st.line_chart(reduction.set_index("ts")[["drift_before", "drift_after"]])
         
         except Exception as e:
             st.error(f"❌ Error analyzing portfolio: {str(e)}")
@@ -1337,9 +1327,9 @@ else:  # Portfolio Manager
 
 # Footer
 st.divider()
-st.markdown("""
+st.markdown(f"""
     <div style="text-align: center; color: #64748b; padding: 20px;">
         <p><strong>AlphaStream Wealth Master</strong> • v4.0</p>
-        <p style="font-size: 0.85rem;">Market data by Yahoo Finance • For informational purposes only</p>
+        <p style="font-size: 0.85rem;">{get_market_data().label} • For informational purposes only</p>
     </div>
 """, unsafe_allow_html=True)
@@ -0,0 +1,130 @@
+"""Timings for the vectorized paths on synthetic data.
+
+Run from the repository root: python -m benchmarks.bench_core
+Each case prints the median of several runs in milliseconds; absolute
+numbers depend on the machine.
+"""
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from alphastream import core
+from alphastream.charts import build_performance_figure, lttb_indices
+from alphastream.holdings import Holdings
+from alphastream.lots import LotBook
+from alphastream.rebalance import band_weights, round_lots, route_cash_flow
+from alphastream.valuation import PortfolioValuation
+
+
+def median_ms(fn, repeat=7, setup=None):
+    """Median of repeat timed calls after a warm-up; setup() runs untimed and its result is passed to fn"""
+    times = []
+    for _ in range(repeat + 1):
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        fn(*args)
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times[1:]))
+
+
+def random_walk(rng, n_bars, n_symbols):
+    days = pd.bdate_range(end="2024-06-03", periods=n_bars)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (n_bars, n_symbols)), axis=0))
+    return pd.DataFrame(closes, index=days, columns=[f"S{i:03d}" for i in range(n_symbols)])
+
+
+def bench_scan(rng):
+    symbols = [f"S{i:03d}" for i in range(400)]
+    profiles = {
+        f"P{p}": {
+            "principal": 10000.0, "start_date": "2018-01-02", "drift_tolerance": 5.0,
+            "last_rebalanced": "2024-01-02 10:00:00",
+            "assets": {s: {"units": float(rng.uniform(1, 50)), "target": 5.0} for s in rng.choice(symbols, 20, replace=False)},
+        }
+        for p in range(500)
+    }
+    prices = {s: float(p) for s, p in zip(symbols, rng.uniform(10, 500, len(symbols)))}
+    holdings = Holdings.from_profiles(profiles)
+
+    def scan_and_details():
+        _, rows = core.scan_profiles(holdings, prices)
+        core.drift_details(rows)
+
+    yield "scan_profiles, 500 profiles x 20 assets", median_ms(lambda: core.scan_profiles(holdings, prices))
+    yield "scan_profiles + drift_details for every tile", median_ms(scan_and_details)
+
+
+def bench_valuation(rng):
+    closes = random_walk(rng, 5040, 40)
+    assets = {s: {"units": 10.0, "target": 2.5} for s in closes.columns}
+
+    # The first extend grows the buffers; time a later one that writes into the spare rows
+    def grown():
+        return PortfolioValuation(closes.iloc[:-10], assets).extend(closes.iloc[:-5])
+
+    def settled_tip():
+        tip = grown()
+        tip.extend(closes.iloc[:-3])  # a sibling already claimed the spare rows
+        return tip
+
+    intraday = closes.copy()
+    intraday.iloc[-6] *= 1.01
+
+    yield "valuation 20y x 40 assets, full", median_ms(lambda: PortfolioValuation(closes, assets))
+    yield "valuation extend by 5 bars into spare rows", median_ms(lambda v: v.extend(closes), setup=grown)
+    yield "valuation extend, last bar changed (copy-on-write)", median_ms(lambda v: v.extend(intraday), setup=grown)
+    yield "valuation extend from a non-tip (copy-on-write)", median_ms(lambda v: v.extend(closes), setup=settled_tip)
+
+
+def bench_chart(rng):
+    values = random_walk(rng, 6300, 1).iloc[:, 0] * 100
+    goal = pd.Series(core.goal_path(10000.0, 8.0, len(values)), index=values.index)
+    benchmark = random_walk(rng, 6300, 1).iloc[:, 0]
+    x = values.index.asi8
+
+    yield "lttb_indices, 6,300 bars to 1,500", median_ms(lambda: lttb_indices(x, values.to_numpy(), 1500))
+    yield "performance figure, 6,300 bars + benchmark", median_ms(
+        lambda: build_performance_figure(values, goal, 8.0, benchmark, "SPY", 5.0)
+    )
+
+
+def bench_solvers(rng):
+    n = 200
+    targets = rng.dirichlet(np.ones(n)) * 100
+    weights = rng.dirichlet(np.ones(n)) * 100
+    prices = rng.uniform(5, 500, n)
+
+    yield "band_weights, 200 assets", median_ms(lambda: band_weights(weights, targets, 1.0, 0.5))
+    yield "round_lots, 200 assets", median_ms(lambda: round_lots(weights * 1000 / prices, prices))
+    yield "route_cash_flow, 200 assets", median_ms(lambda: route_cash_flow(weights * 1000, targets, 5000.0))
+
+
+def bench_lots(rng):
+    n = 5000
+    tickers = np.array([f"S{i:03d}" for i in range(50)])
+    book = LotBook(
+        rng.choice(tickers, n),
+        [date(2024, 6, 3) - timedelta(days=int(d)) for d in rng.integers(1, 3000, n)],
+        rng.uniform(1, 20, n),
+        rng.uniform(20, 200, n),
+    )
+    sells = {t: u / 2 for t, u in book.held().items()}
+    prices = {t: 110.0 for t in tickers}
+    for method in core.SELL_METHODS:
+        yield f"sell from 5,000 lots ({method})", median_ms(lambda: book.sell(sells, prices, method))
+
+
+CASES = [bench_scan, bench_valuation, bench_chart, bench_solvers, bench_lots]
+
+
+def main():
+    rng = np.random.default_rng(0)
+    for case in CASES:
+        for label, ms in case(rng):
+            print(f"{label}: {ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+from alphastream.cache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_their_kinds_ttl():
+    clock = Clock()
+    cache = TTLCache({"quote": 60, "history": 900}, clock=clock)
+    calls = []
+    fetch = lambda: calls.append(1) or len(calls)
+    assert cache.get_or_fetch("quote", "AAA", fetch) == 1
+    assert cache.get_or_fetch("history", "AAA", fetch) == 2
+    clock.now = 59
+    assert cache.get_or_fetch("quote", "AAA", fetch) == 1
+    clock.now = 61
+    assert cache.get_or_fetch("quote", "AAA", fetch) == 3
+    assert cache.get_or_fetch("history", "AAA", fetch) == 2
+    assert cache.stats()["quote"] == {"hits": 1, "misses": 2, "evictions": 0, "entries": 1}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2)
+    cache.put("quote", "A", 1)
+    cache.put("quote", "B", 2)
+    cache.get_or_fetch("quote", "A", lambda: pytest.fail("A should be cached"))
+    cache.put("quote", "C", 3)
+    assert cache.get_many("quote", ["A", "B", "C"], lambda missing: {}) == {"A": 1, "C": 3}
+    assert cache.stats()["quote"]["evictions"] == 1
+
+
+def test_get_many_fetches_only_the_misses_in_one_call():
+    cache = TTLCache()
+    cache.put("quote", "A", 1)
+    batches = []
+
+    def fetch_many(missing):
+        batches.append(list(missing))
+        return {k: ord(k) for k in missing if k != "Z"}
+
+    assert cache.get_many("quote", ["A", "B", "C", "Z"], fetch_many) == {"A": 1, "B": 66, "C": 67}
+    assert batches == [["B", "C", "Z"]]
+    # Keys the fetch left out are not cached
+    cache.get_many("quote", ["Z"], fetch_many)
+    assert batches[-1] == ["Z"]
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = TTLCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("history", "K", slow_fetch))) for _ in range(8)]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert calls == [1]
+    assert results == ["value"] * 8
+
+
+def test_a_failed_fetch_reaches_every_waiter_and_is_not_cached():
+    cache = TTLCache()
+    with pytest.raises(ConnectionError):
+        cache.get_or_fetch("quote", "A", lambda: (_ for _ in ()).throw(ConnectionError("down")))
+    assert cache.get_or_fetch("quote", "A", lambda: 5) == 5
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from alphastream import calendars
+from alphastream.calendars import align, exchange_for
+from alphastream.valuation import PortfolioValuation
+
+
+def mixed_closes():
+    # TSX-only and NYSE-only holidays leave NaN on the other listing; LATE listed on day 3
+    index = pd.bdate_range("2024-07-01", periods=6)
+    return pd.DataFrame({
+        "AAA": [10.0, 11.0, 12.0, np.nan, 14.0, 15.0],
+        "CCC.TO": [np.nan, 20.0, 21.0, 22.0, 23.0, 24.0],
+        "LATE": [np.nan, np.nan, 5.0, 6.0, np.nan, 7.0],
+    }, index=index)
+
+
+def test_exchange_for_reads_the_suffix():
+    assert exchange_for("CCC.TO") == "XTSE"
+    assert exchange_for("BRK.B") == calendars.DEFAULT_EXCHANGE
+    assert exchange_for("AAA") == calendars.DEFAULT_EXCHANGE
+
+
+def test_ffill_only_fills_holes_but_not_before_a_listing(monkeypatch):
+    monkeypatch.setattr(calendars, "union_index", lambda *args: None)
+    aligned = align(mixed_closes())
+    assert aligned["AAA"].tolist() == [10.0, 11.0, 12.0, 12.0, 14.0, 15.0]
+    assert np.isnan(aligned["CCC.TO"].iloc[0]) and aligned["LATE"].iloc[:2].isna().all()
+    assert aligned["LATE"].iloc[4] == 6.0
+
+
+def test_ffill_values_a_later_listing_at_its_first_close(monkeypatch):
+    monkeypatch.setattr(calendars, "union_index", lambda *args: None)
+    aligned = align(mixed_closes(), "ffill")
+    assert not aligned.isna().any().any()
+    assert aligned["LATE"].iloc[:2].tolist() == [5.0, 5.0]
+
+
+def test_none_only_reindexes(monkeypatch):
+    monkeypatch.setattr(calendars, "union_index", lambda *args: None)
+    closes = mixed_closes()
+    assert align(closes, "none").equals(closes)
+
+
+def test_a_session_missing_from_every_symbol_is_added_from_the_calendar(monkeypatch):
+    closes = mixed_closes().drop(pd.Timestamp("2024-07-04"))
+    monkeypatch.setattr(calendars, "union_index", lambda *args: pd.bdate_range("2024-07-01", periods=6))
+    aligned = align(closes)
+    assert pd.Timestamp("2024-07-04") in aligned.index
+    assert aligned.loc["2024-07-04", "AAA"] == 12.0
+
+
+def test_an_unknown_policy_is_rejected():
+    with pytest.raises(ValueError, match="bfill"):
+        align(mixed_closes(), "bfill")
+
+
+def test_valuation_counts_nothing_before_a_listing(monkeypatch):
+    monkeypatch.setattr(calendars, "union_index", lambda *args: None)
+    assets = {t: {"units": 1.0, "target": 100 / 3} for t in ["AAA", "CCC.TO", "LATE"]}
+    valuation = PortfolioValuation(align(mixed_closes()), assets)
+    assert valuation.values.tolist() == [10.0, 31.0, 38.0, 40.0, 43.0, 46.0]
+    assert valuation.weights[0].tolist() == [100.0, 0.0, 0.0]
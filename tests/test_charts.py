@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from alphastream.charts import build_performance_figure, downsample, lttb_indices, series_version
+from alphastream.metrics import data_version
+from alphastream.planner import PricePlan
+
+
+def lttb_loop(x, y, threshold):
+    """Bucket-by-bucket LTTB with the previous bucket's average as the anchor"""
+    n = len(y)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    buckets = [np.arange(a, b) for a, b in zip(edges[:-1], edges[1:])]
+    means = [(x[b].mean(), y[b].mean()) for b in buckets]
+    selected = [0]
+    for i, b in enumerate(buckets):
+        ax, ay = means[i - 1] if i else (x[0], y[0])
+        nx, ny = means[i + 1] if i + 1 < len(buckets) else (x[-1], y[-1])
+        area = np.abs((ax - nx) * (y[b] - ay) - (ax - x[b]) * (ny - ay))
+        selected.append(int(b[np.argmax(area)]))
+    return np.array(selected + [n - 1])
+
+
+@pytest.mark.parametrize("n, threshold", [(100, 10), (1000, 37), (6300, 1500)])
+def test_lttb_matches_the_bucket_loop(n, threshold):
+    rng = np.random.default_rng(n)
+    x = np.arange(n, dtype=float)
+    y = np.cumsum(rng.normal(size=n))
+    got = lttb_indices(x, y, threshold)
+    assert len(got) == threshold
+    assert got[0] == 0 and got[-1] == n - 1
+    assert np.all(np.diff(got) > 0)
+    assert np.array_equal(got, lttb_loop(x, y, threshold))
+
+
+def test_lttb_keeps_every_point_below_the_threshold():
+    assert np.array_equal(lttb_indices(np.arange(5), np.ones(5), 10), np.arange(5))
+
+
+def test_lttb_picks_a_gap_only_where_a_bucket_has_nothing_else():
+    y = np.sin(np.linspace(0, 20, 500))
+    y[100:140] = np.nan
+    got = lttb_indices(np.arange(500), y, 50)
+    edges = np.linspace(1, 499, 49).astype(np.int64)
+    has_data = [np.isfinite(y[a:b]).any() for a, b in zip(edges[:-1], edges[1:])]
+    assert np.array_equal(np.isfinite(y[got[1:-1]]), has_data)
+
+
+def test_figure_is_cut_to_the_range_before_downsampling():
+    index = pd.bdate_range("2000-01-03", periods=6300)
+    values = pd.Series(np.linspace(100, 500, len(index)), index=index)
+    goal = values * 0.9
+    fig = build_performance_figure(values, goal, 8.0, chart_range="1Y", max_points=100)
+    kept = pd.DatetimeIndex(fig.data[0].x)
+    assert len(kept) <= 100
+    assert kept[0] >= index[-1] - pd.DateOffset(years=1) and kept[-1] == index[-1]
+    assert list(fig.data[1].x) == list(fig.data[0].x)
+    assert len(downsample(values.iloc[-50:], 100)) == 50
+
+
+@pytest.mark.parametrize("stamps", [("a", "b"), None])
+def test_a_rebased_benchmark_gets_a_new_figure_key(stamps):
+    index = pd.bdate_range("2024-01-01", periods=30)
+    closes = pd.DataFrame({"AAA": np.linspace(10, 20, 30), "SPY": np.linspace(400, 500, 30)}, index=index)
+    # A re-base halves every earlier close and leaves the newest bar alone
+    rebased = closes.copy()
+    rebased.iloc[:-1] *= 0.5
+    keys = []
+    for i, frame in enumerate([closes, rebased]):
+        if stamps:
+            frame.attrs["versions"] = {"AAA": "x", "SPY": stamps[i]}
+        plan = PricePlan().add("holding", ["AAA"]).add("benchmark", ["SPY"])
+        spy = plan.history(lambda symbols, start: frame, "2024-01-01").series("SPY")
+        keys.append(series_version(spy, data_version(spy)))
+    assert keys[0] != keys[1]
+    assert keys[0][1:] == keys[1][1:]
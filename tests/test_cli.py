@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from alphastream import cli
+from alphastream.db import WealthDB
+
+PRICES = {"AAA": 100.0, "BBB": 50.0}
+
+
+def profiles(last_rebalanced=None):
+    return {
+        "Drifted": {
+            "principal": 1000.0, "start_date": "2020-01-02", "drift_tolerance": 5.0, "last_rebalanced": "2024-01-02 10:00:00",
+            "assets": {"AAA": {"units": 9.0, "target": 50.0}, "BBB": {"units": 2.0, "target": 50.0}},
+        },
+        "Fresh": {
+            "principal": 1000.0, "start_date": "2020-01-02", "drift_tolerance": 5.0, "last_rebalanced": last_rebalanced,
+            "assets": {"AAA": {"units": 5.0, "target": 50.0}, "BBB": {"units": 10.0, "target": 50.0}},
+        },
+    }
+
+
+@pytest.mark.parametrize("report", ["drift", "rebalance"])
+def test_both_reports_flag_never_rebalanced_profiles(report):
+    rows = cli.run_report(report, {"Fresh": profiles()["Fresh"]}, PRICES)
+    assert rows["needs_rebalance"].all()
+    balanced = cli.run_report(report, {"Fresh": profiles("2024-01-02 10:00:00")["Fresh"]}, PRICES)
+    assert not balanced["needs_rebalance"].any()
+
+
+def test_chunked_report_matches_a_single_chunk():
+    many = {f"{name}{i}": p for i in range(7) for name, p in profiles().items()}
+    whole = cli.run_report("rebalance", many, PRICES, chunk_size=1000, cash_flow=250.0)
+    chunked = cli.run_report("rebalance", many, PRICES, chunk_size=3, cash_flow=250.0)
+    assert whole.equals(chunked)
+
+
+@pytest.mark.parametrize("report", ["drift", "rebalance"])
+def test_fail_on_drift_exit_code(report, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("ALPHASTREAM_PROVIDER", "synthetic")
+    db = WealthDB(str(tmp_path / "wealth.db"), legacy_json=None)
+    data, snapshot = db.load()
+    data["profiles"] = {"Fresh": profiles()["Fresh"]}
+    db.save(data, snapshot)
+    args = [report, "--db", db.path, "--format", "json", "--workers", "1", "--fail-on-drift"]
+    assert cli.main(args) == 1
+    assert json.loads(capsys.readouterr().out)[0]["profile"] == "Fresh"
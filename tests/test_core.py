@@ -0,0 +1,93 @@
+import subprocess
+import sys
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from alphastream import core
+from alphastream.db import WealthDB
+from alphastream.lots import LotBook
+
+NOW = datetime(2024, 6, 3, 12, 0)
+
+
+def profile():
+    return {
+        "principal": 1000.0, "start_date": "2020-01-02", "drift_tolerance": 5.0, "last_rebalanced": None,
+        "assets": {"AAA": {"units": 8.0, "target": 50.0}, "BBB": {"units": 4.0, "target": 50.0}},
+    }
+
+
+def trades():
+    return pd.DataFrame({
+        "ticker": ["AAA", "BBB"], "units": [8.0, 4.0], "price": [100.0, 50.0], "value": [800.0, 200.0],
+        "target": [50.0, 50.0], "drift": [30.0, -30.0],
+        "trade_units": [-3.0, 6.0], "trade_value": [-300.0, 300.0], "target_units": [5.0, 10.0],
+    })
+
+
+def test_core_imports_without_streamlit():
+    code = "import sys, alphastream.core; sys.exit('streamlit' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
+
+
+def test_rebalance_profile_moves_units_lots_and_logs():
+    prof = profile()
+    book = LotBook(["AAA", "BBB"], ["2020-01-02", "2020-01-02"], [8.0, 4.0], [60.0, 40.0])
+    events, book = core.rebalance_profile("P", prof, trades(), book, now=NOW)
+    assert {t: a["units"] for t, a in prof["assets"].items()} == {"AAA": 5.0, "BBB": 10.0}
+    assert prof["last_rebalanced"] == "2024-06-03 12:00:00"
+    assert book.held() == {"AAA": 5.0, "BBB": 10.0}
+    (_, kind, ts, detail, record), activity = events
+    assert kind == "rebalance" and record["turnover"] == 600.0
+    assert detail == "🔴 AAA SELL 3.0000, 🟢 BBB BUY 6.0000"
+    assert activity[1:] == ("activity", ts, "Portfolio rebalanced to target allocations - Status: Balanced")
+
+
+def test_rebalance_profile_moves_the_principal_with_a_cash_flow():
+    prof = profile()
+    rows = trades().assign(trade_units=[0.0, 6.0], trade_value=[0.0, 300.0], target_units=[8.0, 10.0])
+    events, _ = core.rebalance_profile("P", prof, rows, LotBook.from_rows([]), "cash_flow", cash_flow=300.0, now=NOW)
+    assert prof["principal"] == 1300.0
+    assert events[0][3].startswith("💵 Cash flow +300.00: ")
+    assert events[1][3] == "Routed a $300.00 contribution through 1 asset(s)"
+
+
+def test_rebalance_profile_without_trades_changes_nothing():
+    prof = profile()
+    rows = trades().assign(trade_units=0.0, trade_value=0.0, target_units=[8.0, 4.0])
+    book = LotBook.from_rows([])
+    events, after = core.rebalance_profile("P", prof, rows, book, "cash_flow", cash_flow=0.0, now=NOW)
+    assert events == [] and after is book
+    assert prof == profile()
+
+
+def test_a_zero_cash_flow_batch_trades_nothing():
+    profiles = {"P": profile()}
+    summary, holdings = core.scan_profiles(profiles, {"AAA": 100.0, "BBB": 50.0}, now=NOW)
+    assert not core.batch_trades(summary, holdings, ["P"], cash_flow=0.0)["trade_units"].any()
+    assert core.batch_trades(summary, holdings, ["P"])["trade_units"].any()
+
+
+def test_lot_backfill_happens_once(tmp_path):
+    db = WealthDB(str(tmp_path / "wealth.db"), legacy_json=None)
+    prof = profile()
+    calls = []
+    opening = lambda: calls.append(1) or {"AAA": 20.0, "BBB": 10.0}
+    book = db.lots.current("P", prof["assets"], prof["start_date"], {}, opening)
+    assert book.frame()["estimated"].all() and calls == [1]
+    db.lots.store("P", book)
+    prof["assets"]["AAA"]["units"] = 9.0
+    book = db.lots.current("P", prof["assets"], prof["start_date"], {"AAA": 100.0}, opening, today="2024-06-03")
+    assert calls == [1]
+    assert ("AAA", "2024-06-03", 1.0, 100.0, 1) in book.rows()
+    assert book.held() == {"AAA": 9.0, "BBB": 4.0}
+
+
+@pytest.mark.parametrize("mode, text", [
+    ("band", "Brought 2 drifted asset(s) back inside the 5.0% band"),
+    ("target", "Portfolio rebalanced to target allocations - Status: Balanced"),
+])
+def test_activity_text_follows_the_mode(mode, text):
+    assert core.rebalance_activity(mode, core.trade_record(trades(), mode), profile()) == text
@@ -0,0 +1,245 @@
+import json
+import sqlite3
+
+import pytest
+
+from alphastream.db import ConflictError, WealthDB, merge
+from alphastream.lots import LotBook
+
+
+def make_db(tmp_path, profiles=None):
+    legacy = tmp_path / "legacy.json"
+    if profiles is not None:
+        legacy.write_text(json.dumps({"profiles": profiles, "global_logs": []}))
+    return WealthDB(str(tmp_path / "wealth.db"), legacy_json=str(legacy))
+
+
+def profile(**fields):
+    base = {
+        "currency": "USD", "principal": 1000.0, "yearly_goal_pct": 8.0, "start_date": "2020-01-02",
+        "assets": {"AAA": {"units": 10.0, "target": 60.0}, "BBB": {"units": 5.0, "target": 40.0}},
+    }
+    base.update(fields)
+    return base
+
+
+# ===== legacy import =====
+
+def test_legacy_json_is_imported_once(tmp_path):
+    db = make_db(tmp_path, {"P": profile()})
+    assert db.load()[0]["profiles"]["P"]["drift_tolerance"] == 5.0
+    (tmp_path / "legacy.json").write_text(json.dumps({"profiles": {"Q": profile()}}))
+    assert list(make_db(tmp_path).load()[0]["profiles"]) == ["P"]
+
+
+def test_save_rewrites_only_changed_profiles(tmp_path):
+    db = make_db(tmp_path, {"P": profile(), "Q": profile()})
+    data, snapshot = db.load()
+    data["profiles"]["P"]["principal"] = 2000.0
+    snapshot = db.save(data, snapshot)
+    assert snapshot["P"][0] == 2 and snapshot["Q"][0] == 1
+    assert db.load()[0]["profiles"]["P"]["principal"] == 2000.0
+
+
+def test_corrupt_legacy_json_is_reported_not_imported(tmp_path):
+    (tmp_path / "legacy.json").write_text("{not json")
+    db = make_db(tmp_path)
+    assert db.migration_error and "legacy.json" in db.migration_error
+    assert db.load()[0]["profiles"] == {}
+
+
+def test_a_fixed_legacy_json_is_imported_on_a_later_start(tmp_path):
+    (tmp_path / "legacy.json").write_text("{not json")
+    make_db(tmp_path)
+    db = make_db(tmp_path, {"P": profile()})
+    assert db.migration_error is None
+    assert list(db.load()[0]["profiles"]) == ["P"]
+
+
+# ===== merge =====
+
+def test_merge_takes_edits_to_different_fields():
+    base = {"principal": 1, "goal": 5}
+    assert merge(base, {"principal": 2, "goal": 5}, {"principal": 1, "goal": 7}, "P") == {"principal": 2, "goal": 7}
+
+
+def test_merge_same_field_same_value_is_not_a_conflict():
+    assert merge({"goal": 5}, {"goal": 7}, {"goal": 7}, "P") == {"goal": 7}
+
+
+def test_merge_same_field_different_values_conflicts():
+    with pytest.raises(ConflictError, match="assets.AAA.units"):
+        merge(
+            {"assets": {"AAA": {"units": 1}}},
+            {"assets": {"AAA": {"units": 2}}},
+            {"assets": {"AAA": {"units": 3}}},
+            "P",
+        )
+
+
+def test_merge_recurses_into_nested_dicts():
+    base = {"assets": {"AAA": {"units": 1, "target": 50}}}
+    theirs = {"assets": {"AAA": {"units": 2, "target": 50}}}
+    ours = {"assets": {"AAA": {"units": 1, "target": 60}}}
+    assert merge(base, theirs, ours, "P") == {"assets": {"AAA": {"units": 2, "target": 60}}}
+
+
+def test_merge_delete_of_an_untouched_key_wins():
+    base = {"assets": {"AAA": {"units": 1}, "BBB": {"units": 2}}}
+    theirs = {"assets": {"AAA": {"units": 1}}}
+    ours = {"assets": {"AAA": {"units": 1}, "BBB": {"units": 2}, "CCC": {"units": 3}}}
+    assert merge(base, theirs, ours, "P") == {"assets": {"AAA": {"units": 1}, "CCC": {"units": 3}}}
+
+
+def test_merge_delete_vs_edit_conflicts():
+    base = {"assets": {"AAA": {"units": 1}}}
+    with pytest.raises(ConflictError):
+        merge(base, {"assets": {}}, {"assets": {"AAA": {"units": 5}}}, "P")
+    with pytest.raises(ConflictError):
+        merge(base, {"assets": {"AAA": {"units": 5}}}, {"assets": {}}, "P")
+
+
+# ===== concurrent saves =====
+
+def test_concurrent_saves_to_different_fields_merge(tmp_path):
+    db = make_db(tmp_path, {"P": profile()})
+    a, snap_a = db.load()
+    b, snap_b = db.load()
+    a["profiles"]["P"]["principal"] = 2000.0
+    db.save(a, snap_a)
+    b["profiles"]["P"]["assets"]["BBB"]["units"] = 6.0
+    db.save(b, snap_b)
+    stored = db.load()[0]["profiles"]["P"]
+    assert stored["principal"] == 2000.0
+    assert stored["assets"]["BBB"]["units"] == 6.0
+
+
+def test_concurrent_saves_to_the_same_field_conflict(tmp_path):
+    db = make_db(tmp_path, {"P": profile()})
+    a, snap_a = db.load()
+    b, snap_b = db.load()
+    a["profiles"]["P"]["principal"] = 2000.0
+    db.save(a, snap_a)
+    b["profiles"]["P"]["principal"] = 3000.0
+    with pytest.raises(ConflictError):
+        db.save(b, snap_b)
+    assert db.load()[0]["profiles"]["P"]["principal"] == 2000.0
+
+
+def test_edit_of_a_profile_deleted_elsewhere_conflicts(tmp_path):
+    db = make_db(tmp_path, {"P": profile()})
+    a, snap_a = db.load()
+    b, snap_b = db.load()
+    del a["profiles"]["P"]
+    db.save(a, snap_a)
+    b["profiles"]["P"]["principal"] = 3000.0
+    with pytest.raises(ConflictError, match="deleted"):
+        db.save(b, snap_b)
+
+
+def lots_for(units):
+    return LotBook(list(units), ["2020-01-02"] * len(units), list(units.values()), [50.0] * len(units))
+
+
+@pytest.mark.parametrize("units_change", [True, False])
+def test_concurrent_lot_writes_conflict(tmp_path, units_change):
+    db = make_db(tmp_path, {"P": profile()})
+    a, snap_a = db.load()
+    b, snap_b = db.load()
+    a["profiles"]["P"]["assets"]["AAA"]["units"] = 6.0
+    db.save(a, snap_a, lots={"P": lots_for({"AAA": 6.0, "BBB": 5.0})})
+    if units_change:
+        b["profiles"]["P"]["assets"]["BBB"]["units"] = 6.0
+    with pytest.raises(ConflictError, match="lots"):
+        db.save(b, snap_b, lots={"P": lots_for({"AAA": 10.0, "BBB": 6.0})})
+    stored = db.load()[0]["profiles"]["P"]["assets"]
+    assert {t: a["units"] for t, a in stored.items()} == {"AAA": 6.0, "BBB": 5.0}
+    assert db.lots.book("P").held() == {"AAA": 6.0, "BBB": 5.0}
+
+
+def test_a_lots_only_save_moves_the_profile_version(tmp_path):
+    db = make_db(tmp_path, {"P": profile()})
+    a, snap_a = db.load()
+    b, snap_b = db.load()
+    snap_a = db.save(a, snap_a, lots={"P": lots_for({"AAA": 10.0, "BBB": 5.0})})
+    assert snap_a["P"][0] == snap_b["P"][0] + 1
+    b["profiles"]["P"]["principal"] = 2000.0
+    db.save(b, snap_b)
+    assert db.load()[0]["profiles"]["P"]["principal"] == 2000.0
+
+
+def test_refresh_pulls_in_other_sessions_changes(tmp_path):
+    db = make_db(tmp_path, {"P": profile()})
+    a, snap_a = db.load()
+    b, snap_b = db.load()
+    a["profiles"]["P"]["principal"] = 2000.0
+    db.save(a, snap_a)
+    snap_b = db.refresh(b, snap_b)
+    assert b["profiles"]["P"]["principal"] == 2000.0
+    assert snap_b["P"][0] == 2
+
+
+# ===== event journal =====
+
+def legacy_profile():
+    return profile(
+        rebalance_logs=[{"date": "2024-02-01 10:00", "event": "Newer"}, {"date": "2024-01-01 10:00", "event": "Older"}],
+        rebalance_stats=["2024-02-01 10:00 - 🟢 AAA BUY 1.5000, 🔴 BBB SELL 2.0000"],
+    )
+
+
+def test_migrate_logs_moves_lists_into_the_journal(tmp_path):
+    db = make_db(tmp_path, {"P": legacy_profile()})
+    stored = db.load()[0]["profiles"]["P"]
+    assert "rebalance_logs" not in stored and "rebalance_stats" not in stored
+    assert [e["event"] for e in db.journal.page("P", "activity")] == ["Newer", "Older"]
+    assert [e["event"] for e in db.journal.page("P", "rebalance")] == ["🟢 AAA BUY 1.5000, 🔴 BBB SELL 2.0000"]
+
+
+def test_reopening_does_not_migrate_twice(tmp_path):
+    make_db(tmp_path, {"P": legacy_profile()})
+    db = make_db(tmp_path, {"P": legacy_profile()})
+    assert db.migrate_logs() is False
+    assert db.journal.count("P", "activity") == 2
+    assert db.journal.count("P", "rebalance") == 1
+    with sqlite3.connect(db.path) as conn:
+        assert conn.execute("SELECT version FROM profiles WHERE name = 'P'").fetchone()[0] == 2
+
+
+def test_journal_pages_newest_first_within_a_time_range(tmp_path):
+    db = make_db(tmp_path, {"P": profile()})
+    for day in range(1, 6):
+        db.journal.append("P", "activity", f"day {day}", ts=f"2024-03-0{day} 09:00")
+    assert [e["event"] for e in db.journal.page("P", "activity", limit=2, offset=1)] == ["day 4", "day 3"]
+    assert db.journal.count("P", "activity", since="2024-03-02", until="2024-03-04") == 2
+
+
+# ===== trade ledger =====
+
+def test_legacy_rebalance_text_is_backfilled_into_trades(tmp_path):
+    db = make_db(tmp_path, {"P": legacy_profile()})
+    trades = db.trades.frame("P")
+    assert trades[["ticker", "side", "units"]].values.tolist() == [["AAA", "BUY", 1.5], ["BBB", "SELL", 2.0]]
+    assert trades["value"].isna().all()
+    # Reopening finds nothing left to backfill
+    assert len(make_db(tmp_path).trades.frame("P")) == 2
+
+
+def test_a_legacy_json_fixed_later_still_reaches_the_trades(tmp_path):
+    (tmp_path / "legacy.json").write_text("{not json")
+    make_db(tmp_path)
+    db = make_db(tmp_path, {"P": legacy_profile()})
+    assert db.trades.frame("P")["ticker"].tolist() == ["AAA", "BBB"]
+
+
+def test_saved_rebalance_records_land_in_trades(tmp_path):
+    db = make_db(tmp_path, {"P": profile()})
+    data, snapshot = db.load()
+    record = {"mode": "target", "turnover": 200.0, "trades": [
+        {"ticker": "AAA", "side": "SELL", "units": 1.0, "price": 100.0, "value": 100.0, "drift_before": 6.0, "drift_after": 0.5},
+        {"ticker": "BBB", "side": "BUY", "units": 2.0, "price": 50.0, "value": 100.0, "drift_before": -6.0, "drift_after": -0.5},
+    ]}
+    db.save(data, snapshot, [("P", "rebalance", "2024-03-01 10:00:00", "🔴 AAA SELL 1.0000, 🟢 BBB BUY 2.0000", record)])
+    trades = db.trades.frame("P", since="2024-01-01")
+    assert trades["value"].sum() == 200.0
+    assert trades["event_id"].nunique() == 1
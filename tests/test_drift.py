@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from alphastream.drift import drift_details, scan_profiles
+
+NOW = datetime(2024, 6, 3, 12, 0)
+
+
+def calculate_drift_status(p_data, prices):
+    """The per-profile loop the dashboard used before scan_profiles"""
+    p_assets = p_data.get("assets", {})
+    if not p_assets:
+        return False, []
+    curr_v = float(sum(p_assets[t]["units"] * prices.get(t, 0) for t in p_assets))
+    if curr_v == 0:
+        return False, []
+    last = p_data.get("last_rebalanced")
+    if last is None:
+        return True, []
+    if (NOW - datetime.strptime(last, "%Y-%m-%d %H:%M:%S")).total_seconds() / 3600 < 24:
+        return False, []
+    details = []
+    for t in p_assets:
+        actual_pct = float(p_assets[t]["units"] * prices.get(t, 0) / curr_v * 100)
+        target_pct = float(p_assets[t]["target"])
+        drift = abs(actual_pct - target_pct)
+        if drift >= p_data.get("drift_tolerance", 5.0):
+            details.append((t, drift, actual_pct, target_pct))
+    return len(details) > 0, details
+
+
+def random_profiles(seed, n=60):
+    rng = np.random.default_rng(seed)
+    symbols = [f"S{i}" for i in range(25)]
+    prices = {s: float(p) for s, p in zip(symbols, rng.uniform(5, 300, len(symbols))) if rng.random() > 0.1}
+    stamps = [None, NOW - timedelta(hours=3), NOW - timedelta(days=40)]
+    profiles = {}
+    for i in range(n):
+        held = rng.choice(symbols, int(rng.integers(0, 8)), replace=False)
+        targets = rng.dirichlet(np.ones(len(held))) * 100 if len(held) else []
+        stamp = stamps[int(rng.integers(0, 3))]
+        profiles[f"P{i}"] = {
+            "principal": 1000.0, "start_date": "2020-01-02",
+            "drift_tolerance": float(rng.choice([2.0, 5.0, 10.0])),
+            "last_rebalanced": stamp.strftime("%Y-%m-%d %H:%M:%S") if stamp else None,
+            "assets": {t: {"units": float(rng.uniform(0, 50)), "target": float(w)} for t, w in zip(held, targets)},
+        }
+    return profiles, prices
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_scan_matches_the_per_profile_loop(seed):
+    profiles, prices = random_profiles(seed)
+    summary, holdings = scan_profiles(profiles, prices, now=NOW)
+    details = drift_details(holdings)
+    for name, p_data in profiles.items():
+        needs, expected = calculate_drift_status(p_data, prices)
+        assert bool(summary.loc[name, "needs_rebalance"]) == needs, name
+        got = details.get(name, [])
+        assert [t for t, *_ in got] == [t for t, *_ in expected], name
+        assert np.allclose([d[1:] for d in got], [d[1:] for d in expected]) if expected else not got
+        assert summary.loc[name, "drift_count"] == len(expected)
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from alphastream.history import drift_reduction, rebalance_frequency, turnover_by_year
+
+
+def trades():
+    return pd.DataFrame({
+        "event_id": [1, 1, 2, 3],
+        "profile": ["P", "P", "P", "P"],
+        "ts": pd.to_datetime(["2023-03-01", "2023-03-01", "2023-09-01", "2024-02-01"]),
+        "ticker": ["AAA", "BBB", "AAA", "BBB"],
+        "side": ["SELL", "BUY", "BUY", "SELL"],
+        "units": [1.0, 2.0, 1.0, 3.0],
+        "value": [100.0, 100.0, 50.0, np.nan],
+        "drift_before": [6.0, -6.0, -3.0, np.nan],
+        "drift_after": [0.5, -0.5, 1.0, np.nan],
+    })
+
+
+def test_turnover_by_year_skips_legacy_trades_without_values():
+    turnover = turnover_by_year(trades())
+    assert turnover.loc[2023] == 250.0
+    assert np.isnan(turnover.loc[2024])
+
+
+def test_rebalance_frequency_counts_events_and_trades():
+    frequency = rebalance_frequency(trades())
+    assert frequency.loc[2023].tolist() == [2, 3]
+    assert frequency.loc[2024].tolist() == [1, 1]
+
+
+def test_drift_reduction_is_per_event():
+    reduction = drift_reduction(trades()).set_index("event_id")
+    assert reduction.loc[1, ["drift_before", "drift_after", "reduction"]].tolist() == [12.0, 1.0, 11.0]
+    assert reduction.loc[2, "reduction"] == 2.0
+    assert np.isnan(reduction.loc[3, "reduction"])
+
+
+def test_empty_trades_aggregate_to_empty_frames():
+    empty = trades().iloc[:0]
+    assert turnover_by_year(empty).empty and rebalance_frequency(empty).empty and drift_reduction(empty).empty
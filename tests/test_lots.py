@@ -0,0 +1,113 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from alphastream.core import execute_trades
+from alphastream.lots import LONG_TERM_DAYS, LONG_TERM_WEIGHT, LotBook
+
+TODAY = date(2024, 6, 3)
+
+
+def random_book(seed, n_lots=60, tickers=("AAA", "BBB", "CCC", "DDD")):
+    rng = np.random.default_rng(seed)
+    return LotBook(
+        rng.choice(tickers, n_lots),
+        [TODAY - timedelta(days=int(d)) for d in rng.integers(1, 1500, n_lots)],
+        rng.uniform(0.5, 20, n_lots).round(3),
+        rng.uniform(20, 200, n_lots).round(2),
+    )
+
+
+def reference_select(book, sell_units, prices, method):
+    """Lot-by-lot loop: rank each ticker's lots by the method, then take units in that order"""
+    today = np.datetime64(TODAY, "D")
+    taken = np.zeros(len(book))
+    for ticker in book.symbols:
+        lots = [i for i in range(len(book)) if book.tickers[i] == ticker]
+
+        def rank(i):
+            if method == "FIFO":
+                return book.dates[i]
+            if method == "HIFO":
+                return -book.cost[i]
+            gain = prices[ticker] - book.cost[i]
+            held = int((today - book.dates[i]).astype(int))
+            return gain * LONG_TERM_WEIGHT if gain > 0 and held > LONG_TERM_DAYS else gain
+
+        left = sell_units.get(ticker, 0.0)
+        for i in sorted(lots, key=rank):
+            take = min(left, book.units[i])
+            taken[i] = take
+            left -= take
+    return taken
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("method", ["FIFO", "HIFO", "MIN_GAIN"])
+def test_select_matches_a_loop_over_lots(seed, method):
+    book = random_book(seed)
+    held = book.held()
+    rng = np.random.default_rng(seed + 100)
+    # Partial sells, a whole position and more than is held
+    sell_units = {t: u * f for (t, u), f in zip(held.items(), rng.choice([0.3, 0.75, 1.0, 1.5], len(held)))}
+    prices = {t: float(p) for t, p in zip(held, rng.uniform(20, 200, len(held)))}
+    expected = reference_select(book, sell_units, prices, method)
+    assert np.allclose(book.select(sell_units, prices, method, TODAY), expected)
+
+
+def test_select_rejects_an_unknown_method():
+    with pytest.raises(ValueError, match="LIFO"):
+        random_book(0).select({"AAA": 1.0}, {}, "LIFO")
+
+
+def test_sell_returns_the_remaining_book_and_realized_gains():
+    book = LotBook(["AAA", "AAA"], ["2020-01-02", "2024-01-02"], [10.0, 5.0], [50.0, 90.0])
+    after, sales = book.sell({"AAA": 12.0}, {"AAA": 100.0}, "FIFO", TODAY)
+    assert after.rows() == [("AAA", "2024-01-02", 3.0, 90.0, 0)]
+    assert sales["units"].tolist() == [10.0, 2.0]
+    assert sales["gain"].tolist() == [500.0, 20.0]
+    assert sales["long_term"].tolist() == [True, False]
+
+
+def test_rows_round_trip():
+    book = random_book(3)
+    again = LotBook.from_rows(book.rows())
+    assert again.rows() == book.rows()
+
+
+def test_reconcile_flags_opening_lots_as_estimated():
+    book = LotBook(["AAA"], ["2023-05-01"], [4.0], [80.0])
+    book = book.reconcile({"AAA": 10.0, "BBB": 2.0}, "2020-01-02", {"AAA": 40.0, "BBB": 15.0})
+    assert book.held() == {"AAA": 10.0, "BBB": 2.0}
+    frame = book.frame().set_index(["ticker", "date"])
+    assert frame.loc[("AAA", pd.Timestamp("2020-01-02")), "estimated"]
+    assert not frame.loc[("AAA", pd.Timestamp("2023-05-01")), "estimated"]
+    _, sales = book.sell({"AAA": 7.0}, {"AAA": 100.0}, "FIFO", TODAY)
+    assert sales["estimated"].tolist() == [True, False]
+
+
+def test_set_units_opens_a_lot_today_or_closes_fifo():
+    book = LotBook(["AAA", "AAA"], ["2020-01-02", "2023-01-02"], [5.0, 5.0], [40.0, 60.0])
+    grown = book.set_units("AAA", 12.0, 100.0, TODAY)
+    assert grown.rows()[-1] == ("AAA", str(TODAY), 2.0, 100.0, 0)
+    shrunk = book.set_units("AAA", 3.0, 100.0, TODAY)
+    assert shrunk.rows() == [("AAA", "2023-01-02", 3.0, 60.0, 0)]
+    assert book.set_units("AAA", 0.0, 100.0, TODAY).rows() == []
+
+
+def test_execute_trades_sells_by_method_and_buys_today():
+    book = LotBook(["AAA", "AAA", "BBB"], ["2020-01-02", "2023-01-02", "2021-01-04"], [5.0, 5.0, 4.0], [40.0, 90.0, 20.0])
+    trades = pd.DataFrame({
+        "ticker": ["AAA", "BBB"],
+        "price": [100.0, 25.0],
+        "trade_units": [-6.0, 2.0],
+        "target_units": [4.0, 6.0],
+    })
+    units, after, sales = execute_trades(book, trades, "HIFO", TODAY)
+    assert units == {"AAA": 4.0, "BBB": 6.0}
+    assert after.held() == pytest.approx(units)
+    assert sales["cost"].tolist() == [40.0, 90.0]
+    assert sales["units"].tolist() == [1.0, 5.0]
+    assert ("BBB", str(TODAY), 2.0, 25.0, 0) in after.rows()
@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+
+from alphastream.cache import TTLCache
+from alphastream.metadata import MetadataStore
+from alphastream.providers import FixtureProvider, MarketDataProvider, SyntheticProvider, period_start
+from alphastream.symbols import validate_ticker
+
+
+@pytest.fixture
+def old_fixtures(tmp_path):
+    days = pd.bdate_range("2021-01-04", "2021-03-31", name="Date")
+    pd.DataFrame({"Close": range(1, len(days) + 1)}, index=days).astype(float).to_csv(tmp_path / "AAA.csv")
+    return FixtureProvider(str(tmp_path))
+
+
+def test_periods_count_back_from_the_fixtures_last_bar(old_fixtures):
+    frame = old_fixtures.history(["AAA"], period="5d")["AAA"]
+    assert frame.index[-1] == pd.Timestamp("2021-03-31")
+    assert frame.index[0] >= pd.Timestamp(period_start("5d", frame.index[-1].date()))
+
+
+def test_old_fixtures_still_quote_and_validate(old_fixtures, tmp_path):
+    assert old_fixtures.quotes(["AAA", "ZZZ"]) == {"AAA": float(len(pd.bdate_range("2021-01-04", "2021-03-31")))}
+    metadata = MetadataStore(str(tmp_path / "meta.db"), old_fixtures)
+    assert validate_ticker("AAA", old_fixtures, metadata, TTLCache())["valid"]
+
+
+def test_an_explicit_start_is_kept(old_fixtures):
+    assert old_fixtures.history(["AAA"], start="2021-03-01")["AAA"].index[0] == pd.Timestamp("2021-03-01")
+
+
+def test_providers_must_implement_history():
+    class Incomplete(MarketDataProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+    assert SyntheticProvider().history(["AAA"], period="1mo")["AAA"].index[-1] <= pd.Timestamp.today()
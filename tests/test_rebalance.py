@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from alphastream.rebalance import band_weights, round_lots, route_cash_flow
+
+
+def random_portfolio(rng, n):
+    targets = rng.dirichlet(np.ones(n)) * 100
+    weights = rng.dirichlet(np.ones(n)) * 100
+    return weights, targets
+
+
+# ===== round_lots =====
+
+@pytest.mark.parametrize("seed", range(20))
+def test_round_lots_stays_within_budget_in_whole_lots(seed):
+    rng = np.random.default_rng(seed)
+    prices = rng.uniform(5, 500, 15)
+    target_units = rng.uniform(0, 50, 15)
+    units, cash = round_lots(target_units, prices)
+    assert np.allclose(units, np.round(units))
+    assert (units * prices).sum() + cash == pytest.approx((target_units * prices).sum())
+    assert cash >= 0
+    assert np.all(np.abs(units - target_units) < 1 + 1e-9)
+
+
+def test_round_lots_spends_leftover_cash_where_it_closes_the_most_drift():
+    # Floors leave $90 + $40; one more AAA lot ($100) fits and fills the larger shortfall
+    units, cash = round_lots(np.array([2.9, 4.4]), np.array([100.0, 100.0]))
+    assert np.allclose(units, [3.0, 4.0])
+    assert cash == pytest.approx(30.0)
+
+
+def test_round_lots_rounds_to_the_lot_size_and_skips_unpriced_assets():
+    units, _ = round_lots(np.array([123.0, 7.5]), np.array([10.0, np.nan]), lot_size=10.0)
+    assert units[0] % 10 == 0 and units[0] <= 130
+    assert units[1] == 7.5
+
+
+# ===== band_weights =====
+
+@pytest.mark.parametrize("seed", range(20))
+def test_band_weights_keeps_the_total(seed):
+    weights, targets = random_portfolio(np.random.default_rng(seed), 12)
+    assert band_weights(weights, targets, 5.0).sum() == pytest.approx(100.0)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_band_weights_ends_inside_the_band(seed):
+    rng = np.random.default_rng(seed)
+    targets = np.full(10, 10.0)
+    weights = targets + rng.uniform(-8, 8, 10)
+    weights = weights / weights.sum() * 100
+    new = band_weights(weights, targets, 5.0, inner_band=2.0)
+    assert np.all(np.abs(new - targets) <= 5.0 + 1e-9)
+    breached = np.abs(weights - targets) >= 5.0
+    assert np.all(np.abs(new[breached] - targets[breached]) <= 2.0 + 1e-9)
+
+
+def test_band_weights_leaves_a_portfolio_inside_tolerance_alone():
+    weights = np.array([52.0, 48.0])
+    assert np.allclose(band_weights(weights, np.array([50.0, 50.0]), 5.0), weights)
+
+
+def test_band_weights_moves_breaching_assets_only_to_the_band_edge():
+    new = band_weights(np.array([70.0, 30.0]), np.array([60.0, 40.0]), 5.0)
+    assert np.allclose(new, [65.0, 35.0])
+
+
+# ===== route_cash_flow =====
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("flow", [2500.0, -2500.0])
+def test_route_cash_flow_trades_one_way_and_spends_the_flow(seed, flow):
+    rng = np.random.default_rng(seed)
+    weights, targets = random_portfolio(rng, 8)
+    values = weights * 100
+    new = route_cash_flow(values, targets, flow)
+    assert new.sum() == pytest.approx(values.sum() + flow)
+    assert np.all(new >= -1e-9)
+    if flow > 0:
+        assert np.all(new >= values - 1e-9)
+    else:
+        assert np.all(new <= values + 1e-9)
+
+
+def test_route_cash_flow_fills_the_most_underweight_first():
+    new = route_cash_flow(np.array([700.0, 200.0, 100.0]), np.array([50.0, 25.0, 25.0]), 100.0)
+    assert np.allclose(new, [700.0, 200.0, 200.0])
+
+
+def test_route_cash_flow_caps_a_withdrawal_at_the_holdings():
+    assert np.allclose(route_cash_flow(np.array([300.0, 200.0]), np.array([50.0, 50.0]), -1000.0), 0.0)
+
+
+def test_route_cash_flow_of_zero_trades_nothing():
+    values = np.array([700.0, 300.0])
+    assert np.array_equal(route_cash_flow(values, np.array([50.0, 50.0]), 0.0), values)
+
+
+def test_route_cash_flow_routes_each_group_on_its_own():
+    values = np.array([600.0, 400.0, 100.0, 100.0])
+    targets = np.array([50.0, 50.0, 50.0, 50.0])
+    groups = np.array([0, 0, 1, 1])
+    new = route_cash_flow(values, targets, np.array([200.0, -100.0]), groups)
+    assert new[:2].sum() == pytest.approx(1200.0)
+    assert new[2:].sum() == pytest.approx(100.0)
+    assert np.allclose(new[:2], [600.0, 600.0])
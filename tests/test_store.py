@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+import pandas as pd
+
+from alphastream.store import PriceStore
+
+
+class SplitProvider:
+    """Adjusted closes of 100 that the provider re-bases to 50 after a 2:1 split"""
+
+    def __init__(self, days):
+        self.days = days
+        self.split = False
+        self.starts = []
+
+    def history(self, symbols, start):
+        self.starts.append(str(start))
+        days = self.days[self.days >= pd.Timestamp(start)]
+        close = 50.0 if self.split else 100.0
+        return {s: pd.DataFrame({"Close": close}, index=days) for s in symbols}
+
+
+def test_top_up_refetches_history_after_a_rebase(tmp_path):
+    provider = SplitProvider(pd.bdate_range("2024-01-01", periods=20))
+    store = PriceStore(str(tmp_path / "prices.db"), provider, stale_after=timedelta(0))
+    provider.days = provider.days[:10]
+    store.sync(["AAA"], "2024-01-01")
+    before = store.read(["AAA"])
+    assert before["AAA"].eq(100.0).all()
+
+    provider.days = pd.bdate_range("2024-01-01", periods=20)
+    provider.split = True
+    store.sync(["AAA"], "2024-01-01")
+    after = store.read(["AAA"])
+    assert len(after) == 20
+    assert after["AAA"].eq(50.0).all()
+    assert provider.starts[-1] == "2024-01-01"
+    assert after.attrs["versions"]["AAA"] != before.attrs["versions"]["AAA"]
+
+
+def test_top_up_without_a_rebase_only_fetches_the_tail(tmp_path):
+    provider = SplitProvider(pd.bdate_range("2024-01-01", periods=10))
+    store = PriceStore(str(tmp_path / "prices.db"), provider, stale_after=timedelta(0))
+    store.sync(["AAA"], "2024-01-01")
+    before = store.read(["AAA"])
+    provider.days = pd.bdate_range("2024-01-01", periods=20)
+    store.sync(["AAA"], "2024-01-01")
+    after = store.read(["AAA"])
+    assert len(after) == 20
+    assert provider.starts == ["2024-01-01", "2024-01-11"]
+    assert after.attrs["versions"] == before.attrs["versions"]
+
+
+class DownProvider:
+    def history(self, symbols, start):
+        raise ConnectionError("provider down")
+
+
+def test_a_failed_fetch_is_logged_and_stored_bars_still_served(tmp_path, caplog):
+    provider = SplitProvider(pd.bdate_range("2024-01-01", periods=10))
+    store = PriceStore(str(tmp_path / "prices.db"), provider, stale_after=timedelta(0))
+    store.sync(["AAA"], "2024-01-01")
+    store.provider = DownProvider()
+    with caplog.at_level("ERROR", logger="alphastream.store"):
+        store.sync(["AAA"], "2024-01-01")
+    assert "AAA" in caplog.text and "provider down" in caplog.text
+    assert len(store.read(["AAA"])) == 10
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from alphastream.metrics import MetricsCache
+from alphastream.valuation import PortfolioValuation
+
+ASSETS = {"AAA": {"units": 2.0, "target": 60.0}, "BBB": {"units": 5.0, "target": 40.0}}
+
+
+def closes(days, seed=0, scale=1.0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2023-01-02", periods=days)
+    frame = pd.DataFrame(rng.uniform(10, 100, (days, 2)) * scale, index=index, columns=["AAA", "BBB"])
+    frame.iloc[:5, 1] = np.nan  # BBB listed later
+    return frame
+
+
+def assert_same(got, expected):
+    assert got.index.equals(expected.index)
+    for name in ("prices", "values", "positions", "weights"):
+        assert np.array_equal(getattr(got, name), getattr(expected, name), equal_nan=True), name
+
+
+def test_extend_matches_a_full_valuation():
+    full = closes(300)
+    valuation = PortfolioValuation(full.iloc[:100], ASSETS)
+    for end in (101, 150, 151, 260, 300):
+        # The last bar of each step is an intraday snapshot that the next step settles
+        partial = full.iloc[:end].copy()
+        partial.iloc[-1] *= 0.99
+        valuation = valuation.extend(partial)
+        assert_same(valuation, PortfolioValuation(partial, ASSETS))
+        valuation = valuation.extend(full.iloc[:end])
+        assert_same(valuation, PortfolioValuation(full.iloc[:end], ASSETS))
+
+
+def test_extend_never_changes_the_valuation_it_extends():
+    full = closes(40)
+    parent = PortfolioValuation(full.iloc[:20], ASSETS)
+    parent = parent.extend(full.iloc[:25])  # leaves spare capacity in the buffers
+    before = {name: getattr(parent, name).copy() for name in ("prices", "values", "weights")}
+    moved = full.iloc[:30].copy()
+    moved.iloc[24] *= 1.5
+    child = parent.extend(moved)
+    sibling = parent.extend(full.iloc[:30])
+    grandchild = sibling.extend(full.iloc[:35])
+    for name, values in before.items():
+        assert np.array_equal(getattr(parent, name), values, equal_nan=True), name
+    assert_same(child, PortfolioValuation(moved, ASSETS))
+    assert_same(sibling, PortfolioValuation(full.iloc[:30], ASSETS))
+    assert_same(grandchild, PortfolioValuation(full.iloc[:35], ASSETS))
+
+
+def test_another_data_version_is_revalued_in_full():
+    history = closes(60)
+    valuation = PortfolioValuation(history.iloc[:50], ASSETS, version="v1")
+    rebased = history * 0.5
+    assert_same(valuation.extend(rebased, version="v2"), PortfolioValuation(rebased, ASSETS))
+
+
+def versioned(frame, stamp):
+    frame = frame.copy()
+    frame.attrs["versions"] = {s: stamp for s in frame.columns}
+    return frame
+
+
+@pytest.mark.parametrize("stamped", [True, False])
+def test_cache_does_not_serve_a_rebased_history(stamped):
+    cache = MetricsCache()
+    history = closes(60)
+    first = versioned(history, "a") if stamped else history
+    cache.valuation(first, ASSETS)
+    # A re-base rewrites every earlier close but leaves the newest bar alone
+    rebased = history * 0.5
+    rebased.iloc[-1] = history.iloc[-1]
+    second = versioned(rebased, "b") if stamped else rebased
+    assert_same(cache.valuation(second, ASSETS), PortfolioValuation(rebased, ASSETS))
+    assert cache.stats == {"hits": 0, "misses": 2}
+
+
+def test_cache_hits_the_same_data_and_extends_a_grown_tail():
+    cache = MetricsCache()
+    history = closes(80)
+    first = cache.valuation(versioned(history.iloc[:70], "a"), ASSETS)
+    assert cache.valuation(versioned(history.iloc[:70], "a"), ASSETS) is first
+    grown = cache.valuation(versioned(history, "a"), ASSETS)
+    assert_same(grown, PortfolioValuation(history, ASSETS))
+    assert_same(first, PortfolioValuation(history.iloc[:70], ASSETS))
+    assert cache.stats == {"hits": 1, "misses": 2}